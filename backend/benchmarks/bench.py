@@ -0,0 +1,283 @@
+"""
+Benchmark suite: per-stage timings (conversion, preview, modification) and an HTTP load scenario.
+
+Run from backend/:
+
+    python -m benchmarks.bench                       # full run, prints JSON
+    python -m benchmarks.bench --quick --output run.json
+    python -m benchmarks.bench --compare benchmarks/baseline.json --tolerance 0.25
+
+The LLM is replaced by the deterministic stub in llm_stub.py (with a fixed latency),
+so only this backend's own work is measured. Exit status is 1 when --compare finds a
+regression beyond the tolerance.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_resume_docx, make_resume_pdf
+
+FULL = {"pages": [1, 10, 50], "convert_runs": [5, 3, 1], "throughput_jobs": 8, "preview_runs": 30,
+        "modify_runs": 20, "users": 16, "iterations": 10, "load_pages": 10,
+        "startup_runs": 5}
+QUICK = {"pages": [1, 5], "convert_runs": [2, 1], "throughput_jobs": 4, "preview_runs": 10,
+         "modify_runs": 5, "users": 4, "iterations": 3, "load_pages": 1,
+         "startup_runs": 2}
+STUB_LATENCY = 0.05
+
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples) -> dict:
+    """Latency summary in milliseconds of a list of durations in seconds"""
+    return {
+        "count": len(samples),
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+    }
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+async def _timed_async(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+def bench_startup(workdir: str, config: dict, results: dict):
+    """Cold `import main` in a fresh interpreter, i.e. what every worker boot pays before serving"""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "UPLOAD_FOLDER": os.path.join(workdir, "uploads"), "DATA_FOLDER": os.path.join(workdir, "data")}
+    run = functools.partial(subprocess.run, [sys.executable, "-c", "import main"], cwd=backend, env=env, check=True)
+    results["startup.import_main"] = summarize([_timed(run) for _ in range(config["startup_runs"])])
+
+
+async def bench_convert(main, workdir: str, config: dict, results: dict):
+    for pages, runs in zip(config["pages"], config["convert_runs"]):
+        pdf = make_resume_pdf(os.path.join(workdir, f"resume_{pages}p.pdf"), pages)
+        if pages == config["pages"][0]:
+            # Untimed warm-up so worker start-up is not counted as conversion time
+            await main._convert_pdf_to_docx(pdf, os.path.join(workdir, "warmup.docx"))
+        samples = []
+        for i in range(runs):
+            elapsed, _ = await _timed_async(main._convert_pdf_to_docx(pdf, os.path.join(workdir, f"conv_{pages}p_{i}.docx")))
+            samples.append(elapsed)
+        results[f"convert.{pages}p"] = summarize(samples)
+
+    # Many one-page conversions at once: measures the worker pool, not a single conversion
+    pdf = os.path.join(workdir, f"resume_{config['pages'][0]}p.pdf")
+    jobs = config["throughput_jobs"]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        main._convert_pdf_to_docx(pdf, os.path.join(workdir, f"parallel_{i}.docx")) for i in range(jobs)
+    ))
+    elapsed = time.perf_counter() - start
+    results["convert.throughput"] = {"jobs": jobs, "workers": main.conversion_engine.workers,
+                                     "seconds": round(elapsed, 3), "per_second": round(jobs / elapsed, 3)}
+
+
+def bench_preview(main, workdir: str, config: dict, results: dict):
+    from extraction import ExtractionCache, extract_text, read_text_window
+
+    runs = config["preview_runs"]
+    for pages in config["pages"]:
+        docx = make_resume_docx(os.path.join(workdir, f"preview_{pages}p.docx"), pages)
+        results[f"preview.first_page.{pages}p"] = summarize(
+            [_timed(read_text_window, docx, None, main.PREVIEW_PAGE_SIZE) for _ in range(runs)])
+        results[f"preview.full_parse.{pages}p"] = summarize([_timed(extract_text, docx) for _ in range(runs)])
+        cache = ExtractionCache()
+        cache.get_window(docx, None, main.PREVIEW_PAGE_SIZE)
+        results[f"preview.cached.{pages}p"] = summarize(
+            [_timed(cache.get_window, docx, None, main.PREVIEW_PAGE_SIZE) for _ in range(runs)])
+
+
+async def bench_modify(main, workdir: str, config: dict, results: dict, llm):
+    for pages in config["pages"]:
+        source = make_resume_docx(os.path.join(workdir, f"modify_{pages}p.docx"), pages)
+        samples = []
+        for i in range(config["modify_runs"]):
+            doc_path = shutil.copy(source, os.path.join(workdir, f"modify_{pages}p_{i}.docx"))
+            elapsed, success = await _timed_async(
+                main._modify_document_async(doc_path, "Improve the summary", llm, use_cache=False))
+            if not success:
+                raise RuntimeError(f"Modification of the {pages}-page resume failed")
+            samples.append(elapsed)
+        results[f"modify.{pages}p"] = summarize(samples)
+    results["modify.stub_latency_ms"] = STUB_LATENCY * 1000
+
+
+async def bench_http_load(client, workdir: str, config: dict, results: dict):
+    """Virtual users each upload a resume, then page through previews and ask for edits"""
+    import httpx
+
+    docx = make_resume_docx(os.path.join(workdir, "load.docx"), config["load_pages"])
+    samples = {"upload": [], "current_preview": [], "preview": [], "chat_modify": []}
+    errors = 0
+
+    async def request(name, method, url, **kwargs):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            res = await client.request(method, url, **kwargs)
+            ok = res.status_code < 400
+        except httpx.HTTPError:
+            res, ok = None, False
+        samples[name].append(time.perf_counter() - start)
+        if not ok:
+            errors += 1
+        return res
+
+    async def user(n: int):
+        headers = {"X-Session-ID": f"bench-{n}"}
+        # Each user uploads and edits its own document, as real sessions do
+        with open(docx, "rb") as f:
+            res = await request("upload", "POST", "/upload", headers=headers,
+                                files={"file": (f"resume-{n}.docx", f.read())})
+        if res is None or res.status_code >= 400:
+            return
+        filename = res.json()["saved_filename"]
+        for _ in range(config["iterations"]):
+            await request("current_preview", "GET", "/current-preview", headers=headers)
+            await request("preview", "GET", f"/preview/{filename}", params={"limit": 2000})
+            await request("chat_modify", "POST", "/chat", headers=headers, json={"message": "Improve the summary"})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(n) for n in range(config["users"])))
+    elapsed = time.perf_counter() - start
+    total = sum(len(s) for s in samples.values())
+    for name, values in samples.items():
+        if values:
+            results[f"http.{name}"] = summarize(values)
+    results["http.throughput"] = {"users": config["users"], "pages": config["load_pages"], "requests": total,
+                                  "errors": errors, "seconds": round(elapsed, 3),
+                                  "per_second": round(total / elapsed, 3)}
+
+
+def _peak_rss() -> dict:
+    """Peak resident set size of this process and of its (finished) conversion workers, in MiB"""
+    scale = 1024 if sys.platform != "darwin" else 1024 * 1024
+    return {
+        "self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+async def _run(config: dict, workdir: str, url: str = None) -> dict:
+    import httpx
+    import main
+    from llm import LLMClient
+    from llm_stub import create_stub_app
+
+    llm = LLMClient(api_key="stub", base_url="http://llm-stub",
+                    transport=httpx.ASGITransport(app=create_stub_app(latency=STUB_LATENCY)))
+    main.llm_client = llm
+    results = {}
+    bench_startup(workdir, config, results)
+    try:
+        await bench_convert(main, workdir, config, results)
+        bench_preview(main, workdir, config, results)
+        await bench_modify(main, workdir, config, results, llm)
+        if url:
+            client = httpx.AsyncClient(base_url=url, timeout=120)
+        else:
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=120)
+        async with client:
+            await bench_http_load(client, workdir, config, results)
+    finally:
+        main.conversion_engine.shutdown()
+        await llm.aclose()
+    results["memory.peak_rss"] = _peak_rss()
+    return results
+
+
+def run(quick: bool = False, url: str = None) -> dict:
+    """Run every stage in a scratch directory and return {"meta": ..., "results": ...}"""
+    config = QUICK if quick else FULL
+    with tempfile.TemporaryDirectory() as workdir:
+        # main reads these at import time, so point it at scratch storage before importing it
+        os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+        os.environ["DATA_FOLDER"] = os.path.join(workdir, "data")
+        os.environ["SESSION_STORE"] = "memory"
+        os.environ.setdefault("LLM_CACHE_TTL", "0")
+        os.makedirs(os.environ["UPLOAD_FOLDER"], exist_ok=True)
+        results = asyncio.run(_run(config, workdir, url))
+    return {
+        "meta": {
+            "mode": "quick" if quick else "full",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return a line per metric that got slower (p95) or lower-throughput than the baseline allows"""
+    regressions = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if not isinstance(base, dict) or not isinstance(now, dict):
+            continue
+        if "p95_ms" in base and now["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {now['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if "per_second" in base and now["per_second"] < base["per_second"] / (1 + tolerance):
+            regressions.append(f"{name}: {now['per_second']}/s vs baseline {base['per_second']}/s")
+    return regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="smaller documents and fewer iterations")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--url", help="run the HTTP load scenario against a running server instead")
+    args = parser.parse_args(argv)
+
+    report = run(quick=args.quick, url=args.url)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("mode") != report["meta"]["mode"]:
+            print(f"warning: baseline is a {baseline['meta'].get('mode')} run, this is {report['meta']['mode']}",
+                  file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,97 @@
+"""
+Deterministic synthetic resumes (DOCX and PDF) from one page up to long multi-page documents with tables
+"""
+
+import random
+
+import fitz
+from docx import Document
+
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Hooli", "Stark Industries", "Wayne Enterprises"]
+ROLES = ["Software Engineer", "Senior Developer", "Data Engineer", "Tech Lead", "Platform Engineer"]
+SKILLS = ["Python", "FastAPI", "React", "Node.js", "PostgreSQL", "Docker", "Kubernetes", "AWS", "Redis", "Go"]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Shipped", "Scaled"]
+THINGS = ["a billing service", "the search pipeline", "CI/CD for 40 services", "a reporting dashboard",
+          "the payments API", "an event-driven ingestion layer", "the mobile backend", "internal tooling"]
+
+# Roughly how much content fills one page
+ENTRIES_PER_PAGE = 5
+BULLETS_PER_ENTRY = 6
+
+
+def _bullet(rng: random.Random) -> str:
+    return (f"{rng.choice(VERBS)} {rng.choice(THINGS)} using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}, "
+            f"improving throughput by {rng.randint(10, 90)}% for {rng.randint(2, 50)} teams.")
+
+
+def resume_sections(pages: int, seed: int = 0):
+    """Yield (kind, payload) items describing a resume about `pages` pages long"""
+    rng = random.Random(seed)
+    yield "heading", "Jordan Example"
+    yield "paragraph", "jordan@example.com | +1 555 0100 | Berlin, Germany | github.com/jordan"
+    yield "heading", "SUMMARY"
+    yield "paragraph", "Engineer focused on backend systems, data pipelines and developer productivity. " * 2
+    yield "heading", "EXPERIENCE"
+    for entry in range(pages * ENTRIES_PER_PAGE):
+        yield "subheading", f"{rng.choice(ROLES)} ({rng.choice(COMPANIES)}) {2024 - entry // 2} - {2025 - entry // 2}"
+        for _ in range(BULLETS_PER_ENTRY):
+            yield "bullet", _bullet(rng)
+        if entry % 3 == 2:
+            yield "table", [["Skill", "Level", "Years"]] + [
+                [rng.choice(SKILLS), rng.choice(["Expert", "Advanced", "Intermediate"]), str(rng.randint(1, 10))]
+                for _ in range(4)
+            ]
+    yield "heading", "EDUCATION"
+    yield "paragraph", "B.Tech Computer Science, Example Institute of Technology (2016 - 2020)"
+
+
+def make_resume_docx(path: str, pages: int = 1, seed: int = 0) -> str:
+    doc = Document()
+    for kind, payload in resume_sections(pages, seed):
+        if kind == "heading":
+            doc.add_heading(payload, level=1)
+        elif kind == "subheading":
+            doc.add_heading(payload, level=2)
+        elif kind == "bullet":
+            doc.add_paragraph(payload, style="List Bullet")
+        elif kind == "table":
+            table = doc.add_table(rows=len(payload), cols=len(payload[0]))
+            table.style = "Table Grid"
+            for r, row in enumerate(payload):
+                for c, text in enumerate(row):
+                    table.rows[r].cells[c].text = text
+        else:
+            doc.add_paragraph(payload)
+    doc.save(path)
+    return path
+
+
+def make_resume_pdf(path: str, pages: int = 1, seed: int = 0) -> str:
+    """Lay the same content out on PDF pages; tables are drawn as ruled grids so pdf2docx detects them"""
+    pdf = fitz.open()
+    page, y = None, 0
+
+    def new_line(height):
+        nonlocal page, y
+        if page is None or y + height > 800:
+            page, y = pdf.new_page(), 50
+        y += height
+        return page
+
+    for kind, payload in resume_sections(pages, seed):
+        if kind == "table":
+            row_height = 18
+            new_line(row_height * len(payload) + 10)
+            top = y - row_height * len(payload)
+            for r, row in enumerate(payload):
+                for c, text in enumerate(row):
+                    rect = fitz.Rect(50 + c * 160, top + r * row_height, 210 + c * 160, top + (r + 1) * row_height)
+                    page.draw_rect(rect, width=0.5)
+                    page.insert_text((rect.x0 + 4, rect.y1 - 5), text, fontsize=9)
+            continue
+        size = {"heading": 14, "subheading": 11}.get(kind, 9)
+        text = ("• " + payload) if kind == "bullet" else payload
+        new_line(size + 6).insert_text((50, y), text[:110], fontsize=size)
+    pdf.save(path)
+    pdf.close()
+    return path
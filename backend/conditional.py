@@ -0,0 +1,135 @@
+"""
+Conditional GET (strong ETags, If-None-Match -> 304) and single byte-range responses for files
+"""
+
+import hashlib
+import os
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def make_etag(content_hash: str, *variant) -> str:
+    """A strong ETag for a representation of content; `variant` covers whatever else shapes the body"""
+    if not variant:
+        return f'"{content_hash}"'
+    suffix = hashlib.sha256(repr(variant).encode()).hexdigest()[:16]
+    return f'"{content_hash}-{suffix}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison, as RFC 9110 asks for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(headers: Headers, etag: str) -> Optional[Response]:
+    """A 304 response when the client already holds this ETag, else None"""
+    if etag_matches(headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range, None to send the whole file.
+
+    Raises ValueError when the range cannot be satisfied. Multiple ranges are answered
+    with the whole file, which RFC 9110 allows.
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def content_disposition(filename: str) -> str:
+    """An attachment header for filename, RFC 5987-encoded when it is not a plain ASCII token (as Starlette does)"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _read_file(path: str, start: int, end: int):
+    # Sync generator: Starlette iterates it in a worker thread
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _read_file_on(run, path: str, start: int, end: int):
+    # Each blocking call goes through `run` (e.g. a BoundedExecutor's); never shed once the response has started
+    f = await run(open, path, "rb", shed=False)
+    try:
+        await run(f.seek, start, shed=False)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await run(f.read, min(CHUNK_SIZE, remaining), shed=False)
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run(f.close, shed=False)
+
+
+def file_response(path: str, headers: Headers, etag: str, filename: str,
+                  media_type: str = "application/octet-stream", run=None) -> Response:
+    """The file as a 200, a 206 for a satisfiable Range, a 416 otherwise, or a 304 when the ETag matches.
+
+    With `run` (an async callable taking fn, *args and `shed`) the file is read through it;
+    otherwise Starlette reads it on its own thread pool.
+    """
+    cached = not_modified(headers, etag)
+    if cached is not None:
+        return cached
+    size = os.path.getsize(path)
+    response_headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+        "Content-Disposition": content_disposition(filename),
+    }
+    # A Range with a stale If-Range gets the whole (new) file
+    if_range = headers.get("if-range")
+    try:
+        byte_range = parse_range(headers.get("range"), size) if not if_range or if_range == etag else None
+    except ValueError:
+        return Response(status_code=416, headers={**response_headers, "Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+    response_headers["Content-Length"] = str(max(end - start + 1, 0))
+    body = _read_file(path, start, end) if run is None else _read_file_on(run, path, start, end)
+    if byte_range is None:
+        return StreamingResponse(body, media_type=media_type, headers=response_headers)
+    response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(body, status_code=206, media_type=media_type, headers=response_headers)
@@ -0,0 +1,50 @@
+"""
+Shared test setup: every test runs against throwaway app state, never the real uploads/, data/ or previews/
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+STATE = ("UPLOAD_FOLDER", "SECTION_INDEX_FOLDER", "session_store", "llm_cache", "llm_client",
+         "version_store", "prerenderer", "dedup_index")
+
+
+@contextmanager
+def temp_stores():
+    """Point every folder and store of the app at a fresh temp dir; the real ones are restored afterwards.
+
+    Yields the temp dir. Uploads go to `main.UPLOAD_FOLDER`, a subfolder of it.
+    """
+    import main
+    from dedup import DedupIndex
+    from llm_cache import LLMResponseCache
+    from prerender import Prerenderer
+    from sessions import MemorySessionStore
+    from versions import VersionStore
+
+    saved = {name: getattr(main, name) for name in STATE}
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            main.UPLOAD_FOLDER = os.path.join(tmp, "uploads")
+            main.SECTION_INDEX_FOLDER = os.path.join(tmp, "sections")
+            os.makedirs(main.UPLOAD_FOLDER)
+            os.makedirs(main.SECTION_INDEX_FOLDER)
+            main.session_store = MemorySessionStore()
+            # An empty response cache, so tests never replay each other's answers
+            main.llm_cache = LLMResponseCache(os.path.join(tmp, "llm_cache.sqlite3"))
+            main.version_store = VersionStore(os.path.join(tmp, "versions"))
+            main.prerenderer = Prerenderer(os.path.join(tmp, "previews"))
+            main.dedup_index = DedupIndex(os.path.join(tmp, "dedup"))
+            yield tmp
+        finally:
+            for name, value in saved.items():
+                setattr(main, name, value)
+
+
+@pytest.fixture(autouse=True)
+def app_state():
+    with temp_stores() as tmp:
+        yield tmp
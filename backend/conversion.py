@@ -0,0 +1,301 @@
+"""
+PDF -> DOCX conversion engine backed by a bounded pool of worker processes
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+FINISHED_STATES = {DONE, FAILED, TIMEOUT, CANCELLED}
+
+
+class QueueFull(Exception):
+    """Raised when the conversion queue cannot accept another job"""
+
+
+def _worker_main(conn, ready):
+    """Worker process loop: convert (pdf_path, docx_path) tasks until told to stop"""
+    # Import here so the parent process never pays for pdf2docx/OpenCV
+    from pdf2docx import Converter
+    ready.set()
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+        pdf_path, docx_path = task
+        try:
+            cv = Converter(pdf_path)
+            try:
+                cv.convert(docx_path)
+            finally:
+                cv.close()
+            conn.send((True, None))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+class _Worker:
+    """A single long-lived conversion process and the pipe used to talk to it"""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.ready = ctx.Event()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, self.ready), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self):
+        """Hard-stop the process, used when a conversion times out or is cancelled"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=2)
+        self.kill()
+
+
+class ConversionJob:
+    """State of one queued/running/finished conversion"""
+
+    def __init__(self, pdf_path: str, docx_path: str):
+        self.id = uuid.uuid4().hex
+        self.pdf_path = pdf_path
+        self.docx_path = docx_path
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = asyncio.Event()
+        self._cancel = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+    def to_dict(self) -> dict:
+        duration = None
+        if self.started_at and self.finished_at:
+            duration = round(self.finished_at - self.started_at, 3)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "saved_filename": os.path.basename(self.docx_path),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": duration,
+        }
+
+
+class ConversionEngine:
+    """Runs pdf2docx in separate processes so conversions use all cores and never hold the server's GIL.
+
+    Jobs wait in a bounded queue (submit raises QueueFull when it is full) and are
+    handed to `workers` long-lived processes. A job that exceeds `timeout` seconds,
+    or is cancelled while running, has its worker process killed and replaced.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32, timeout: float = 120, max_history: int = 1000):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_history = max_history
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs: "OrderedDict[str, ConversionJob]" = OrderedDict()
+        self._pool = [None] * self.workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatchers = []
+        self._loop = None
+        self._running = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First use, or the previous event loop went away: (re)create the queue and dispatchers
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._dispatchers = [loop.create_task(self._dispatch(slot)) for slot in range(self.workers)]
+
+    def submit(self, pdf_path: str, docx_path: str) -> ConversionJob:
+        """Queue a conversion and return its job immediately"""
+        self._ensure_started()
+        job = ConversionJob(pdf_path, docx_path)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"Conversion queue is full ({self.max_queue} jobs waiting)")
+        self._jobs[job.id] = job
+        self._trim_history()
+        return job
+
+    async def submit_wait(self, pdf_path: str, docx_path: str) -> ConversionJob:
+        """Queue a conversion, waiting for room in the queue instead of failing when it is full"""
+        self._ensure_started()
+        job = ConversionJob(pdf_path, docx_path)
+        self._jobs[job.id] = job
+        self._trim_history()
+        await self._queue.put(job)
+        return job
+
+    async def wait(self, job: ConversionJob) -> ConversionJob:
+        await job._done.wait()
+        return job
+
+    def get(self, job_id: str) -> Optional[ConversionJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ConversionJob]:
+        """Cancel a queued job, or kill the worker running it"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.status == QUEUED:
+            job._finish(CANCELLED)
+        else:
+            job._cancel.set()
+        return job
+
+    def start_workers(self):
+        """Start every worker process now rather than on its first job, so pdf2docx loads ahead of time"""
+        for slot in range(self.workers):
+            self._worker(slot)
+
+    def workers_ready(self) -> int:
+        """Worker processes that are up and have pdf2docx loaded"""
+        return sum(1 for w in self._pool if w is not None and w.alive() and w.ready.is_set())
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        self._loop = None
+        for i, worker in enumerate(self._pool):
+            if worker is not None:
+                worker.stop()
+                self._pool[i] = None
+
+    def _trim_history(self):
+        while len(self._jobs) > self.max_history:
+            oldest_id = next(iter(self._jobs))
+            if not self._jobs[oldest_id].finished:
+                break
+            self._jobs.pop(oldest_id)
+
+    def _worker(self, slot: int) -> _Worker:
+        worker = self._pool[slot]
+        if worker is None or not worker.alive():
+            worker = self._pool[slot] = _Worker(self._ctx)
+        return worker
+
+    def _replace_worker(self, slot: int):
+        worker = self._pool[slot]
+        if worker is not None:
+            worker.kill()
+        self._pool[slot] = None
+
+    async def _dispatch(self, slot: int):
+        while True:
+            job = await self._queue.get()
+            if job.finished:
+                continue
+            self._running += 1
+            try:
+                await self._run(slot, job)
+            except Exception as e:
+                # A broken pipe or a worker that failed to start must not take this slot's loop down
+                self._replace_worker(slot)
+                _remove_quietly(job.docx_path)
+                if not job.finished:
+                    job._finish(FAILED, f"Conversion worker error: {e}")
+            finally:
+                self._running -= 1
+
+    async def _run(self, slot: int, job: ConversionJob):
+        loop = asyncio.get_running_loop()
+        worker = self._worker(slot)
+        job.status = RUNNING
+        job.started_at = time.time()
+        worker.conn.send((job.pdf_path, job.docx_path))
+
+        result = loop.create_future()
+        fd = worker.conn.fileno()
+
+        def _on_readable():
+            loop.remove_reader(fd)
+            if result.done():
+                return
+            try:
+                result.set_result(worker.conn.recv())
+            except (EOFError, OSError) as e:
+                result.set_exception(e)
+
+        loop.add_reader(fd, _on_readable)
+        cancelled = loop.create_task(job._cancel.wait())
+        try:
+            done, _ = await asyncio.wait({result, cancelled}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            loop.remove_reader(fd)
+            cancelled.cancel()
+
+        if result in done:
+            try:
+                ok, error = result.result()
+            except (EOFError, OSError):
+                self._replace_worker(slot)
+                job._finish(FAILED, "Conversion worker exited unexpectedly")
+                return
+            job._finish(DONE if ok else FAILED, error)
+            return
+
+        # Timed out or cancelled: the conversion is still running, so kill the process
+        result.cancel()
+        self._replace_worker(slot)
+        _remove_quietly(job.docx_path)
+        job._finish(CANCELLED if job._cancel.is_set() else TIMEOUT)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,102 @@
+"""
+Content-hash index of converted uploads, so byte-identical PDFs are converted only once
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class DedupIndex:
+    """Maps the sha256 of an uploaded PDF to a pristine copy of its converted DOCX.
+
+    The copies live in `<folder>/converted/<sha256>.docx` and the index in a small
+    SQLite database next to them; working copies handed to users are always fresh
+    copies, so later edits never touch the stored conversion.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.blob_dir = os.path.join(folder, "converted")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db_path = os.path.join(folder, "dedup.sqlite3")
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS conversions (
+                    source_sha256 TEXT PRIMARY KEY,
+                    source_size INTEGER NOT NULL,
+                    docx_size INTEGER NOT NULL,
+                    conversion_seconds REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_hit_at REAL
+                )"""
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, f"{sha256}.docx")
+
+    def lookup(self, sha256: str) -> Optional[str]:
+        """Return the stored DOCX for a source hash, or None if it was never converted"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM conversions WHERE source_sha256 = ?", (sha256,)).fetchone()
+        path = self._blob_path(sha256)
+        if row and os.path.exists(path):
+            return path
+        return None
+
+    def add(self, sha256: str, docx_path: str, source_size: int, conversion_seconds: float):
+        """Keep a pristine copy of a fresh conversion and index it"""
+        blob = self._blob_path(sha256)
+        # Unique temp name: two workers may index the same PDF at the same time
+        tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            shutil.copyfile(docx_path, tmp)
+            os.replace(tmp, blob)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO conversions
+                   (source_sha256, source_size, docx_size, conversion_seconds, created_at, hits)
+                   VALUES (?, ?, ?, ?, ?, 0)""",
+                (sha256, source_size, os.path.getsize(blob), conversion_seconds, time.time()),
+            )
+
+    def checkout(self, sha256: str, dest_path: str) -> bool:
+        """Copy the stored conversion to a new working file; False if it is not indexed"""
+        blob = self.lookup(sha256)
+        if blob is None:
+            return False
+        shutil.copyfile(blob, dest_path)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE conversions SET hits = hits + 1, last_hit_at = ? WHERE source_sha256 = ?",
+                (time.time(), sha256),
+            )
+        return True
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, hits, seconds_saved, bytes_stored = conn.execute(
+                """SELECT COUNT(*), COALESCE(SUM(hits), 0),
+                          COALESCE(SUM(hits * conversion_seconds), 0),
+                          COALESCE(SUM(docx_size), 0)
+                   FROM conversions"""
+            ).fetchone()
+        return {
+            "entries": entries,
+            "conversions_skipped": hits,
+            "conversion_seconds_saved": round(seconds_saved, 3),
+            "bytes_stored": bytes_stored,
+        }
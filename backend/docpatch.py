@@ -0,0 +1,181 @@
+"""
+Block IDs and in-place patch operations for DOCX documents.
+
+Every body paragraph gets an ID `p<n>` (its position in doc.paragraphs) and every
+table cell an ID `t<table>r<row>c<col>`. The model is shown "[id] text" lines and
+answers with operations that are applied in place, so untouched blocks keep their
+runs, styles and formatting:
+
+    {"op": "replace", "id": "p3", "text": "..."}
+    {"op": "insert_after", "id": "p3", "text": "..."}
+    {"op": "delete", "id": "p5"}
+"""
+
+import copy
+import re
+from typing import Dict, List, Optional, Tuple
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+CELL_ID = re.compile(r"^t(\d+)r(\d+)c(\d+)$")
+OPERATIONS = {"replace", "insert_after", "delete"}
+
+
+def iter_blocks(doc) -> List[Tuple[str, object]]:
+    """Return (id, block) pairs in document order; blocks are Paragraphs or table _Cells"""
+    blocks = [(f"p{i}", p) for i, p in enumerate(doc.paragraphs)]
+    for t, table in enumerate(doc.tables):
+        seen = set()
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                # Merged cells show up once per grid column; only number the first occurrence
+                if id(cell._tc) in seen:
+                    continue
+                seen.add(id(cell._tc))
+                blocks.append((f"t{t}r{r}c{c}", cell))
+    return blocks
+
+
+def render_blocks(doc, ids: Optional[set] = None) -> str:
+    """Render non-empty blocks as "[id] text" lines, optionally limited to `ids`"""
+    lines = []
+    for block_id, block in iter_blocks(doc):
+        if ids is not None and block_id not in ids:
+            continue
+        text = block.text.strip()
+        if text:
+            lines.append(f"[{block_id}] {' '.join(text.split())}")
+    return "\n".join(lines)
+
+
+def _run_text(el) -> str:
+    """Text of a run, or of every run in a hyperlink, as python-docx reports it"""
+    parts = []
+    for child in el.iter(W + "t", W + "tab", W + "br", W + "cr"):
+        if child.tag == W + "t":
+            parts.append(child.text or "")
+        else:
+            parts.append("\t" if child.tag == W + "tab" else "\n")
+    return "".join(parts)
+
+
+def _dominant_run(runs):
+    """The run holding the most text, i.e. the formatting most of the paragraph is in"""
+    return max(runs, key=lambda r: len(_run_text(r)), default=None)
+
+
+def _write_run_text(run, text: str):
+    # Keep only the run's formatting, then give it a single text element
+    for child in list(run):
+        if child.tag != W + "rPr":
+            run.remove(child)
+    t = run.makeelement(W + "t", {})
+    t.text = text
+    t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+    run.append(t)
+
+
+def _set_paragraph_text(paragraph, text: str):
+    """Replace a paragraph's text, keeping its style and per-run formatting where it can.
+
+    Leading runs whose text the new text still starts with are left untouched; the rest
+    of the new text goes into the dominant remaining run, and the other runs are dropped.
+    """
+    p = paragraph._p
+    segments = [child for child in p if child.tag in (W + "r", W + "hyperlink")]
+    kept = 0
+    remainder = text
+    for segment in segments:
+        segment_text = _run_text(segment)
+        if not segment_text or not remainder.startswith(segment_text):
+            break
+        remainder = remainder[len(segment_text):]
+        kept += 1
+    rest = segments[kept:]
+    template = _dominant_run([r for r in rest if r.tag == W + "r"]) if remainder or not kept else None
+    for child in rest:
+        if child is not template:
+            p.remove(child)
+    if template is not None:
+        _write_run_text(template, remainder)
+    elif remainder or not kept:
+        # No direct run left to write into: continue in the formatting of the last segment
+        # kept, or take it from the runs (e.g. inside a hyperlink) that were just replaced
+        if kept:
+            source = segments[kept - 1] if segments[kept - 1].tag == W + "r" else None
+        else:
+            source = _dominant_run([r for segment in rest for r in segment.iter(W + "r")])
+        run = p.makeelement(W + "r", {})
+        props = source.find(W + "rPr") if source is not None else None
+        if props is not None:
+            run.append(copy.deepcopy(props))
+        _write_run_text(run, remainder)
+        if kept:
+            segments[kept - 1].addnext(run)
+        else:
+            p.append(run)
+
+
+def _clone_paragraph(p):
+    """An empty copy of a paragraph for insert_after: its paragraph properties (without a
+    section break) and its dominant run's formatting, but no text, bookmarks or fields"""
+    new_p = p.makeelement(W + "p", {})
+    props = p.find(W + "pPr")
+    if props is not None:
+        props = copy.deepcopy(props)
+        for section in props.findall(W + "sectPr"):
+            props.remove(section)
+        new_p.append(props)
+    run = new_p.makeelement(W + "r", {})
+    template = _dominant_run(p.findall(W + "r"))
+    if template is not None and template.find(W + "rPr") is not None:
+        run.append(copy.deepcopy(template.find(W + "rPr")))
+    new_p.append(run)
+    return new_p
+
+
+def _set_cell_text(cell, text: str):
+    paragraphs = cell.paragraphs
+    _set_paragraph_text(paragraphs[0], text)
+    for extra in paragraphs[1:]:
+        extra._p.getparent().remove(extra._p)
+
+
+def apply_operations(doc, operations: List[dict]) -> Dict[str, int]:
+    """Apply patch operations in place. IDs refer to the document as it was before any operation.
+
+    Unknown IDs and malformed operations are skipped; the counts are returned.
+    """
+    blocks = dict(iter_blocks(doc))
+    last_inserted = {}
+    applied = skipped = 0
+    for op in operations:
+        if not isinstance(op, dict) or op.get("op") not in OPERATIONS or op.get("id") not in blocks:
+            skipped += 1
+            continue
+        block_id, kind = op["id"], op["op"]
+        block = blocks[block_id]
+        is_cell = CELL_ID.match(block_id) is not None
+        text = str(op.get("text", ""))
+
+        if kind == "replace":
+            if is_cell:
+                _set_cell_text(block, text)
+            else:
+                _set_paragraph_text(block, text)
+        elif kind == "delete":
+            if is_cell:
+                _set_cell_text(block, "")
+            elif block._p.getparent() is not None:
+                block._p.getparent().remove(block._p)
+        else:
+            anchor = block.paragraphs[-1] if is_cell else block
+            if anchor._p.getparent() is None:
+                skipped += 1
+                continue
+            # Clone the anchor so the new paragraph inherits its style; repeated inserts keep their order
+            new_p = _clone_paragraph(anchor._p)
+            _write_run_text(new_p.find(W + "r"), text)
+            last_inserted.get(block_id, anchor._p).addnext(new_p)
+            last_inserted[block_id] = new_p
+        applied += 1
+    return {"applied": applied, "skipped": skipped}
@@ -0,0 +1,67 @@
+"""
+Heavy third-party engines the backend loads lazily, and their background warm-up.
+
+Importing the app never imports these modules; each is imported by the code that
+first needs it, or ahead of time by `warm_up()` once the server is accepting requests.
+"""
+
+import importlib
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class Engine:
+    """A named group of modules that are expensive to import"""
+
+    def __init__(self, name: str, modules: List[str]):
+        self.name = name
+        self.modules = modules
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def warm(self) -> bool:
+        # Also true when a request imported the modules before the warm-up got to them
+        return all(module in sys.modules for module in self.modules)
+
+    def load(self):
+        with self._lock:
+            if self.warm:
+                return
+            start = time.perf_counter()
+            try:
+                for module in self.modules:
+                    importlib.import_module(module)
+            except Exception as e:
+                self.error = str(e)
+                raise
+            self.load_seconds = round(time.perf_counter() - start, 3)
+
+    def status(self) -> dict:
+        return {"warm": self.warm, "load_seconds": self.load_seconds, "error": self.error}
+
+
+ENGINES: Dict[str, Engine] = {
+    "docx": Engine("docx", ["docx"]),
+    "pdf": Engine("pdf", ["fitz"]),
+    "llm": Engine("llm", ["httpx", "groq"]),
+}
+
+
+def warm_up(names: Iterable[str]):
+    """Import the named engines one after another; failures are recorded, not raised"""
+    for name in names:
+        engine = ENGINES.get(name)
+        if engine is None:
+            continue
+        try:
+            engine.load()
+        except Exception:
+            pass
+
+
+def status(names: Iterable[str] = None) -> Dict[str, dict]:
+    return {name: engine.status() for name, engine in ENGINES.items() if names is None or name in names}
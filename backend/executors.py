@@ -0,0 +1,96 @@
+"""
+Named, bounded thread pools for the blocking work async handlers hand off.
+
+Each workload class gets its own pool, so slow document parsing cannot hold up file
+I/O or LLM bookkeeping, and none of them runs on the event loop. When a pool already
+has `workers + max_queue` sheddable calls in flight, new ones are shed with
+ExecutorSaturated (answered as 503) instead of queueing without bound.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a bounded executor's queue is full"""
+
+    def __init__(self, name: str):
+        super().__init__(f"The server is busy ({name} executor saturated), try again shortly")
+        self.name = name
+
+
+class BoundedExecutor:
+    """A thread pool that admits at most `workers + max_queue` sheddable calls at a time"""
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=f"{name}-executor")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._admitted = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args, shed: bool = True, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result.
+
+        Calls that must not be dropped (cleanup, cache writes) pass `shed=False`; they
+        are never rejected and do not count against the limit, so they cannot get
+        interactive calls shed.
+        """
+        with self._lock:
+            if shed and self._admitted >= self.workers + self.max_queue:
+                self.rejected += 1
+                metrics.executor_rejected.inc(executor=self.name)
+                raise ExecutorSaturated(self.name)
+            self._in_flight += 1
+            if shed:
+                self._admitted += 1
+        submitted = time.perf_counter()
+        # Carry context variables (per-request stage timings) into the worker thread, like asyncio.to_thread
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, self._call, submitted, fn, *args, **kwargs)
+        # Released when the call finishes or, if the awaiting task is cancelled while it is queued, is cancelled
+        future.add_done_callback(functools.partial(self._release, shed))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, shed: bool, future):
+        with self._lock:
+            self._in_flight -= 1
+            if shed:
+                self._admitted -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def _call(self, submitted: float, fn, *args, **kwargs):
+        waited = time.perf_counter() - submitted
+        metrics.executor_wait_seconds.observe(waited, executor=self.name)
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def depth(self) -> dict:
+        with self._lock:
+            return {"queued": self._in_flight - self._running, "running": self._running}
+
+    def stats(self) -> dict:
+        return {
+            **self.depth(),
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
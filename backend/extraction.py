@@ -0,0 +1,258 @@
+"""
+Text extraction for document previews, with an in-process content-addressed cache
+"""
+
+import hashlib
+import os
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+# fitz (PyMuPDF) and python-docx are imported on first use so importing this module stays cheap
+
+HASH_CHUNK_SIZE = 1024 * 1024
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@dataclass
+class ExtractedText:
+    """Structured text pulled out of a .pdf or .docx file"""
+    kind: str
+    paragraphs: List[str] = field(default_factory=list)
+    table_rows: List[List[str]] = field(default_factory=list)
+    pages: List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        """Approximate memory footprint in bytes, used for cache accounting"""
+        total = sum(len(p) for p in self.paragraphs) + sum(len(p) for p in self.pages)
+        total += sum(len(c) for row in self.table_rows for c in row)
+        return total * 2 + 256
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file in chunks so large uploads never sit in memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_text(path: str) -> ExtractedText:
+    """Parse a .pdf or .docx file into an ExtractedText"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        import fitz
+        with fitz.open(path) as doc:
+            return ExtractedText(kind="pdf", pages=[page.get_text() for page in doc])
+    if ext == ".docx":
+        from docx import Document
+        doc = Document(path)
+        return ExtractedText(
+            kind="docx",
+            paragraphs=[p.text for p in doc.paragraphs],
+            table_rows=[[cell.text for cell in row.cells] for table in doc.tables for row in table.rows],
+        )
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+@dataclass
+class TextWindow:
+    """One page of preview text and the cursor to continue from (None at the end)"""
+    content: str
+    next_cursor: Optional[str]
+
+    @property
+    def size(self) -> int:
+        return len(self.content) * 2 + 128
+
+
+def iter_docx_lines(path: str) -> Iterator[str]:
+    """Yield body paragraphs and table rows (cells joined by " | ") in document order.
+
+    word/document.xml is read with an incremental parser and elements are cleared as
+    soon as they are consumed, so only as much of the document is parsed as the caller
+    pulls, and memory stays flat however long the document is.
+    """
+    with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as f:
+        table_depth = run_depth = 0
+        parts, cell_paragraphs, row = [], [], []
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            tag = el.tag
+            if event == "start":
+                if tag == W + "tbl":
+                    table_depth += 1
+                elif tag == W + "r":
+                    run_depth += 1
+                continue
+            if tag == W + "r":
+                run_depth -= 1
+            elif tag == W + "t" and run_depth:
+                parts.append(el.text or "")
+            elif tag == W + "tab" and run_depth:
+                parts.append("\t")
+            elif tag in (W + "br", W + "cr") and run_depth:
+                parts.append("\n")
+            elif tag == W + "p":
+                text = "".join(parts)
+                parts = []
+                if table_depth:
+                    cell_paragraphs.append(text)
+                else:
+                    yield text
+                el.clear()
+            elif tag == W + "tc" and table_depth == 1:
+                row.append("\n".join(cell_paragraphs))
+                cell_paragraphs = []
+            elif tag == W + "tr" and table_depth == 1:
+                yield " | ".join(row)
+                row = []
+                el.clear()
+            elif tag == W + "tbl":
+                table_depth -= 1
+                el.clear()
+
+
+def _iter_units(path: str, start: int) -> Iterator[Tuple[int, str]]:
+    """Yield (index, text) preview units from `start` on: pages for PDFs, non-empty lines for DOCX"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        import fitz
+        with fitz.open(path) as doc:
+            # Pages are random access, so resuming at a later page costs nothing extra
+            for index in range(start, doc.page_count):
+                yield index, doc[index].get_text()
+    elif ext == ".docx":
+        index = 0
+        for line in iter_docx_lines(path):
+            if not line.strip():
+                continue
+            if index >= start:
+                yield index, ("\n" if index else "") + line
+            index += 1
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    """Split a "<unit>.<char>" cursor; raises ValueError if malformed"""
+    if not cursor:
+        return 0, 0
+    unit, _, char = cursor.partition(".")
+    unit, char = int(unit), int(char or 0)
+    if unit < 0 or char < 0:
+        raise ValueError("Cursor must not be negative")
+    return unit, char
+
+
+def read_text_window(path: str, cursor: Optional[str] = None, limit: int = 10000) -> TextWindow:
+    """Read up to `limit` characters of preview text starting at `cursor`, parsing no further than needed"""
+    start_unit, start_char = parse_cursor(cursor)
+    parts, taken = [], 0
+    for index, text in _iter_units(path, start_unit):
+        if taken >= limit:
+            # Something is left after a full window
+            return TextWindow("".join(parts), f"{index}.0")
+        offset = start_char if index == start_unit else 0
+        piece = text[offset:offset + limit - taken]
+        parts.append(piece)
+        taken += len(piece)
+        if offset + len(piece) < len(text):
+            return TextWindow("".join(parts), f"{index}.{offset + len(piece)}")
+    return TextWindow("".join(parts), None)
+
+
+class ExtractionCache:
+    """LRU cache of ExtractedText and TextWindows keyed by file content hash, bounded by bytes.
+
+    A (path, mtime, size) fingerprint is remembered per path so a hit does not
+    need to re-hash the file; identical copies under different names share an entry.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._hashes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def content_hash(self, path: str) -> str:
+        """Return the sha256 of the file, re-hashing only when its fingerprint changed"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        fingerprint = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        digest = file_sha256(path)
+        with self._lock:
+            self._hashes[path] = (fingerprint, digest)
+        return digest
+
+    def get(self, path: str) -> ExtractedText:
+        """Return the extracted text of a file, parsing it only on a cache miss"""
+        return self._get_or_load(self.content_hash(path), lambda: extract_text(path))
+
+    def get_window(self, path: str, cursor: Optional[str] = None, limit: int = 10000) -> TextWindow:
+        """Return one page of preview text, reading only as much of the file as that page needs"""
+        key = f"{self.content_hash(path)}:window:{cursor or ''}:{limit}"
+        return self._get_or_load(key, lambda: read_text_window(path, cursor, limit))
+
+    def _get_or_load(self, key: str, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = loader()
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key: str, entry):
+        size = entry.size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, path: str):
+        """Forget everything cached for a path, e.g. after it was rewritten in place"""
+        path = os.path.abspath(path)
+        with self._lock:
+            cached = self._hashes.pop(path, None)
+            if cached is None:
+                return
+            # Drop the full extraction and every preview window of the old content
+            for key in [k for k in self._entries if k.split(":", 1)[0] == cached[1]]:
+                self._bytes -= self._entries.pop(key).size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,100 @@
+"""
+Incremental JSON parsing for streamed LLM output
+"""
+
+import json
+
+
+class JSONArrayStream:
+    """Emit the elements of one top-level array (e.g. "operations") as soon as each is complete.
+
+    Text is fed in arbitrary chunks as it streams from the model. Anything before the
+    first "{" (models sometimes add a preamble) is ignored. Each call to `feed()`
+    returns the elements that were completed by that chunk, already decoded.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.buffer = ""
+        self.count = 0
+        self._pos = 0
+        self._stack = []          # [container, expecting_key] per open object/array
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._top_key = None
+        self._target_depth = None
+        self._item_start = None
+
+    def _at_item_level(self) -> bool:
+        return self._target_depth is not None and len(self._stack) == self._target_depth
+
+    def _emit(self, end: int, out: list):
+        raw = self.buffer[self._item_start:end]
+        self._item_start = None
+        try:
+            out.append(json.loads(raw))
+            self.count += 1
+        except json.JSONDecodeError:
+            pass
+
+    def feed(self, chunk: str) -> list:
+        out = []
+        self.buffer += chunk
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf) and not self._done:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame[0] == "o" and frame[1]:
+                        if len(self._stack) == 1:
+                            self._top_key = json.loads(buf[self._string_start:i + 1])
+                    elif self._at_item_level() and self._item_start == self._string_start:
+                        self._emit(i + 1, out)
+            elif not self._started:
+                if c == "{":
+                    self._started = True
+                    self._stack.append(["o", True])
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._at_item_level() and self._item_start is None:
+                    self._item_start = i
+            elif c in "{[":
+                if self._at_item_level() and self._item_start is None:
+                    self._item_start = i
+                self._stack.append(["o" if c == "{" else "a", c == "{"])
+                if c == "[" and len(self._stack) == 2 and self._top_key == self.key:
+                    self._target_depth = 2
+            elif c in "}]":
+                if self._at_item_level() and self._item_start is not None:
+                    # A bare scalar (number, true, ...) is closed by the end of the array
+                    self._emit(i, out)
+                self._stack.pop()
+                if self._target_depth is not None and len(self._stack) < self._target_depth:
+                    self._target_depth = None
+                elif self._at_item_level() and self._item_start is not None:
+                    self._emit(i + 1, out)
+                if not self._stack:
+                    self._done = True
+            elif c == ":":
+                self._stack[-1][1] = False
+            elif c == ",":
+                if self._stack[-1][0] == "o":
+                    self._stack[-1][1] = True
+                elif self._at_item_level() and self._item_start is not None:
+                    self._emit(i, out)
+            elif not c.isspace() and self._at_item_level() and self._item_start is None:
+                self._item_start = i
+            i += 1
+        self._pos = i
+        return out
@@ -0,0 +1,194 @@
+"""
+Shared async LLM client: one connection pool for the app's lifetime, bounded concurrency and retries
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+from metrics import llm_first_token_seconds, llm_request_seconds, llm_tokens, record_stage
+from rate_limit import RateLimiter, estimate_tokens
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """Wraps AsyncGroq with a keep-alive connection pool, a concurrency limit, a rate limit and jittered retries.
+
+    `base_url` (GROQ_BASE_URL) lets a local OpenAI-compatible stub server stand in for
+    Groq; `transport` lets tests plug in an in-process httpx transport instead. Every
+    attempt, retries included, first takes its share of `rate_limiter`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        model: str = DEFAULT_MODEL,
+        max_concurrency: int = 8,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        transport=None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        # groq and httpx are imported here, on first use, not when the app boots
+        import groq
+        import httpx
+
+        self._groq = groq
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._in_flight = 0
+        self._retries = 0
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+        # Retries are handled here (with jitter and the concurrency slot released while sleeping)
+        self._client = groq.AsyncGroq(api_key=api_key, base_url=base_url, max_retries=0, http_client=self._http)
+
+    async def complete(self, messages, model: Optional[str] = None, **kwargs):
+        """Run a chat completion, retrying 429/5xx/connection errors with jittered exponential backoff"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            completion = await self._complete(messages, model, **kwargs)
+            outcome = "ok"
+            _observe_usage(getattr(completion, "usage", None))
+            return completion
+        finally:
+            _observe_call("complete", outcome, start)
+
+    async def _complete(self, messages, model: Optional[str] = None, **kwargs):
+        attempt = 0
+        estimated = estimate_tokens(messages, kwargs.get("max_tokens"))
+        while True:
+            try:
+                await self.rate_limiter.acquire(estimated)
+                async with self._semaphore:
+                    self._in_flight += 1
+                    try:
+                        completion = await self._client.chat.completions.create(
+                            messages=messages, model=model or self.model, **kwargs
+                        )
+                        self.rate_limiter.settle(estimated, _total_tokens(getattr(completion, "usage", None)))
+                        return completion
+                    finally:
+                        self._in_flight -= 1
+            except (self._groq.APIStatusError, self._groq.APIConnectionError) as e:
+                if attempt >= self.max_retries or not self._retryable(e):
+                    raise
+                delay = self._retry_delay(e, attempt)
+            attempt += 1
+            self._retries += 1
+            await asyncio.sleep(delay)
+
+    async def stream(self, messages, model: Optional[str] = None, **kwargs):
+        """Yield the completion's text deltas as they arrive.
+
+        Failures are retried like `complete()` only until the first delta has been
+        yielded; after that the error propagates to the caller.
+        """
+        attempt = 0
+        start = time.perf_counter()
+        outcome = "error"
+        started = False
+        estimated = estimate_tokens(messages, kwargs.get("max_tokens"))
+        try:
+            while True:
+                try:
+                    await self.rate_limiter.acquire(estimated)
+                    async with self._semaphore:
+                        self._in_flight += 1
+                        try:
+                            stream = await self._client.chat.completions.create(
+                                messages=messages, model=model or self.model, stream=True, **kwargs
+                            )
+                            async for chunk in stream:
+                                delta = chunk.choices[0].delta.content if chunk.choices else None
+                                # Groq reports usage on the last chunk, under x_groq
+                                usage = _field(chunk, "usage") or _field(_field(chunk, "x_groq"), "usage")
+                                _observe_usage(usage)
+                                self.rate_limiter.settle(estimated, _total_tokens(usage))
+                                if delta:
+                                    if not started:
+                                        llm_first_token_seconds.observe(time.perf_counter() - start)
+                                    started = True
+                                    yield delta
+                            outcome = "ok"
+                            return
+                        finally:
+                            self._in_flight -= 1
+                except (self._groq.APIStatusError, self._groq.APIConnectionError) as e:
+                    if started or attempt >= self.max_retries or not self._retryable(e):
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                attempt += 1
+                self._retries += 1
+                await asyncio.sleep(delay)
+        finally:
+            _observe_call("stream", outcome, start)
+
+    def _retryable(self, error) -> bool:
+        if isinstance(error, (self._groq.APIConnectionError, self._groq.APITimeoutError)):
+            return True
+        return error.status_code in RETRYABLE_STATUS_CODES
+
+    def _retry_delay(self, error, attempt: int) -> float:
+        # Honour the server's Retry-After on rate limits; otherwise use full jitter
+        if isinstance(error, self._groq.APIStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            try:
+                if retry_after is not None:
+                    return min(float(retry_after), self.max_backoff) + random.uniform(0, self.backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "retries": self._retries,
+            "rate_limit": self.rate_limiter.stats(),
+        }
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+def _observe_call(mode: str, outcome: str, start: float):
+    elapsed = time.perf_counter() - start
+    llm_request_seconds.observe(elapsed, mode=mode, outcome=outcome)
+    record_stage("llm", elapsed)
+
+
+def _field(value, name: str):
+    """An attribute of an SDK model, or a key when the SDK left the value as a plain dict"""
+    if value is None:
+        return None
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def _total_tokens(usage) -> Optional[int]:
+    return _field(usage, "total_tokens")
+
+
+def _observe_usage(usage):
+    """Record prompt/completion token counts from a usage object or dict, when the API sent one"""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = _field(usage, kind)
+        if count is not None:
+            llm_tokens.observe(count, type=kind.split("_")[0])
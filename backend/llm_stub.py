@@ -0,0 +1,100 @@
+"""
+Deterministic stand-in for the Groq chat completions API, for tests and local development.
+
+Run it as a server and point the backend at it:
+    uvicorn llm_stub:app --port 9000
+    GROQ_BASE_URL=http://localhost:9000 GROQ_API_KEY=stub uvicorn main:app
+
+or plug it into LLMClient in-process with httpx.ASGITransport(app=create_stub_app(...)).
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_REPLY = "Here are some tips to strengthen your resume."
+
+
+def default_responder(messages) -> str:
+    """Patch the first document block (with its own text, upper-cased) or give a canned chat reply"""
+    user = messages[-1]["content"]
+    match = re.search(r"Current document content:\n(.*?)\n\nModification request:", user, re.DOTALL)
+    if not match:
+        return CHAT_REPLY
+    blocks = re.findall(r"^\[(\w+)\] (.*)$", match.group(1), re.MULTILINE)
+    operations = [{"op": "replace", "id": block_id, "text": text.upper()} for block_id, text in blocks[:1]]
+    return json.dumps({"operations": operations})
+
+
+def completion_body(content: str, model: str) -> dict:
+    return {
+        "id": "stub-completion",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": len(content.split()),
+            "total_tokens": len(content.split()),
+        },
+    }
+
+
+def stream_events(content: str, model: str, chunk_size: int = 8):
+    """Server-sent events in the OpenAI streaming format, `chunk_size` characters per delta"""
+    for start in range(0, len(content), chunk_size):
+        chunk = {
+            "id": "stub-completion",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start:start + chunk_size]}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    # Like Groq, finish with an empty delta carrying the usage under x_groq
+    completion_tokens = len(content.split())
+    final = {
+        "id": "stub-completion",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "x_groq": {"usage": {"prompt_tokens": 0, "completion_tokens": completion_tokens,
+                             "total_tokens": completion_tokens}},
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_stub_app(responder=default_responder, fail_first: int = 0, fail_status: int = 429,
+                    latency: float = 0.0) -> FastAPI:
+    """Build the stub app; the first `fail_first` requests answer with `fail_status`.
+
+    `latency` seconds are added to every completion to imitate model response time.
+    """
+    stub = FastAPI()
+    stub.state.requests = []
+
+    @stub.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stub.state.requests.append(body)
+        if len(stub.state.requests) <= fail_first:
+            return JSONResponse(status_code=fail_status, content={"error": {"message": "stub failure"}},
+                                headers={"retry-after": "0"})
+        if latency:
+            await asyncio.sleep(latency)
+        content = responder(body["messages"])
+        if body.get("stream"):
+            return StreamingResponse(stream_events(content, body["model"]), media_type="text/event-stream")
+        return completion_body(content, body["model"])
+
+    return stub
+
+
+app = create_stub_app()
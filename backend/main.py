@@ -1,21 +1,75 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Cookie, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from datetime import datetime
-import fitz
-from pdf2docx import Converter
-from docx import Document
 import asyncio
+import contextvars
+from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from groq import Groq
 from dotenv import load_dotenv
 import json
+import logging
 import re
+import time
+import uuid
+from typing import List, Optional
+from extraction import ExtractionCache
+from conditional import file_response, make_etag, not_modified
+from conversion import ConversionEngine, QueueFull, DONE, TIMEOUT
+from dedup import DedupIndex
+from executors import BoundedExecutor, ExecutorSaturated
+from llm import LLMClient, DEFAULT_MODEL
+from rate_limit import RateLimiter
+from incremental_json import JSONArrayStream
+from docpatch import apply_operations, render_blocks
+from llm_cache import LLMResponseCache
+from prerender import PENDING, READY, Prerenderer
+import engines
+import metrics
+from metrics import RequestMetricsMiddleware, timed
+from section_index import build_index, load_index, save_index, select_block_ids
+from sessions import SESSION_COOKIE, LockTimeout, SessionCookieMiddleware, create_session_store
+from upload_storage import MULTIPART_OVERHEAD, RequestSizeLimitMiddleware, UploadRejected, check_extension, save_upload
+from versions import VersionNotFound, VersionStore
 
 load_dotenv()
-app = FastAPI()
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("resume_editor")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global llm_client
+    # Load heavy engines after startup so the app boots (and answers health checks) right away
+    if "conversion" in WARM_UP_ENGINES:
+        conversion_engine.start_workers()
+    _spawn(background_executor.run(engines.warm_up, WARM_UP_ENGINES, shed=False))
+    yield
+    conversion_engine.shutdown()
+    if llm_client is not None:
+        await llm_client.aclose()
+        llm_client = None
+
+app = FastAPI(lifespan=lifespan)
+
+# Engines to load in the background after startup; /ready reports 503 until they are warm
+WARM_UP_ENGINES = [name.strip() for name in os.getenv("WARM_UP_ENGINES", "docx,pdf,llm,conversion").split(",")
+                   if name.strip()]
+
+# Requests slower than this many seconds are logged with a per-stage breakdown (0 disables)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 2.0))
+app.add_middleware(RequestMetricsMiddleware, slow_seconds=SLOW_REQUEST_SECONDS, logger=logger)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", 512 * 1024 * 1024))
+# Refuse oversized bodies before Starlette spools the multipart form to memory and temp disk.
+# Added before CORS so CORS wraps it and a 413 still carries the CORS headers the frontend needs
+app.add_middleware(RequestSizeLimitMiddleware, limits={
+    "/upload": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+    "/upload/batch": MAX_BATCH_BYTES,
+})
 
 # ✅ CORS Settings for Frontend
 app.add_middleware(
@@ -29,362 +83,1137 @@ app.add_middleware(
 # Only upload and preview APIs are exposed
 
 # ✅ File Upload Endpoint
-UPLOAD_FOLDER = "uploads"
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Track the current active document
-CURRENT_DOCUMENT = None
+# Internal state (indexes, caches) lives next to the uploads, outside the static mount
+DATA_FOLDER = os.getenv("DATA_FOLDER", "data")
+os.makedirs(DATA_FOLDER, exist_ok=True)
+# Section indexes stay out of UPLOAD_FOLDER, which is served publicly
+SECTION_INDEX_FOLDER = os.path.join(DATA_FOLDER, "sections")
+os.makedirs(SECTION_INDEX_FOLDER, exist_ok=True)
+
+# Blocking work runs on one bounded thread pool per workload class, never on the event loop:
+# parse (python-docx, PyMuPDF, text extraction), io (file writes, hashing, SQLite) and llm (response cache)
+parse_executor = BoundedExecutor(
+    "parse", int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1)), int(os.getenv("PARSE_QUEUE_SIZE", 64)))
+io_executor = BoundedExecutor("io", int(os.getenv("IO_WORKERS", 8)), int(os.getenv("IO_QUEUE_SIZE", 256)))
+llm_executor = BoundedExecutor("llm", int(os.getenv("LLM_WORKERS", 4)), int(os.getenv("LLM_QUEUE_SIZE", 64)))
+# Indexing, pre-rendering and warm-up get their own pool, so a large batch upload queues
+# there instead of in front of interactive previews and chats
+background_executor = BoundedExecutor(
+    "background", int(os.getenv("BACKGROUND_WORKERS", 2)), int(os.getenv("BACKGROUND_QUEUE_SIZE", 0)))
+EXECUTORS = [parse_executor, io_executor, llm_executor, background_executor]
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated(request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Each session's active document, shared across worker processes by the sqlite backend
+session_store = create_session_store(os.getenv("SESSION_STORE", "sqlite"), DATA_FOLDER, executor=io_executor)
+DOCUMENT_LOCK_TIMEOUT = float(os.getenv("DOCUMENT_LOCK_TIMEOUT", 60))
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def get_session_id(
+    request: Request,
+    x_session_id: Optional[str] = Header(default=None),
+    session_cookie: Optional[str] = Cookie(default=None, alias=SESSION_COOKIE),
+):
+    """Session the request belongs to: the X-Session-ID header, else the session cookie.
+
+    Clients sending neither are issued a new session, returned as a cookie.
+    """
+    if x_session_id is not None:
+        if not SESSION_ID_PATTERN.match(x_session_id):
+            raise HTTPException(status_code=400, detail="Invalid X-Session-ID header")
+        return x_session_id
+    if session_cookie is not None and SESSION_ID_PATTERN.match(session_cookie):
+        return session_cookie
+    session_id = uuid.uuid4().hex
+    request.state.issued_session_id = session_id
+    return session_id
+
+app.add_middleware(SessionCookieMiddleware, max_age=int(os.getenv("SESSION_COOKIE_MAX_AGE", 30 * 24 * 3600)))
+
+# Parsed preview text, keyed by file content so repeated polling skips re-parsing
+extraction_cache = ExtractionCache(max_bytes=int(os.getenv("EXTRACTION_CACHE_BYTES", 32 * 1024 * 1024)))
 
 # Serve uploads as static files
 app.mount("/uploads", StaticFiles(directory=UPLOAD_FOLDER), name="uploads")
 
+# HTML renderings and page thumbnails per document content, rendered in the background and served statically
+PREVIEW_FOLDER = os.getenv("PREVIEW_FOLDER", "previews")
+prerenderer = Prerenderer(
+    PREVIEW_FOLDER,
+    max_bytes=int(os.getenv("PREVIEW_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    max_pages=int(os.getenv("PREVIEW_THUMBNAIL_PAGES", 10)),
+)
+app.mount("/previews", StaticFiles(directory=PREVIEW_FOLDER), name="previews")
+
+# PDF conversions run in a bounded pool of worker processes (pdf2docx is CPU-bound)
+conversion_engine = ConversionEngine(
+    workers=int(os.getenv("CONVERSION_WORKERS", os.cpu_count() or 1)),
+    max_queue=int(os.getenv("CONVERSION_QUEUE_SIZE", 32)),
+    timeout=float(os.getenv("CONVERSION_TIMEOUT", 120)),
+)
+
+# Converted DOCX per source PDF hash, so re-uploading the same PDF skips conversion
+dedup_index = DedupIndex(os.path.join(DATA_FOLDER, "dedup"))
+
+# Version history: a snapshot of each document before every modification, deduplicated per zip member
+version_store = VersionStore(
+    os.path.join(DATA_FOLDER, "versions"),
+    max_bytes=int(os.getenv("VERSION_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+)
+
+# One LLM client (and HTTP connection pool) shared for the app's lifetime
+llm_client = None
+
+def _get_llm_client():
+    """Return the shared LLM client, creating it on first use"""
+    global llm_client
+    if llm_client is None:
+        groq_key = os.getenv("GROQ_API_KEY")
+        if not groq_key:
+            raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured on server")
+        llm_client = LLMClient(
+            api_key=groq_key,
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+            timeout=float(os.getenv("LLM_TIMEOUT", 60)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 3)),
+            # Provider quotas, shared by chat and bulk edits (0 disables either limit)
+            rate_limiter=RateLimiter(
+                requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", 0)),
+                tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", 0)),
+            ),
+        )
+    return llm_client
+
+# Replayable LLM responses, shared on disk by every worker process
+llm_cache = LLMResponseCache(
+    os.path.join(DATA_FOLDER, "llm_cache.sqlite3"),
+    ttl=float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+# Keep references to fire-and-forget tasks so they are not garbage collected
+_background_tasks = set()
+
+def _spawn(coro, inherit_context: bool = False):
+    """Run coro as a task that outlives the caller.
+
+    The task starts in an empty context, so work that outlives a request does not add its
+    stage timings to that request's; pass `inherit_context` for work that is part of the request.
+    """
+    context = contextvars.copy_context() if inherit_context else contextvars.Context()
+    task = asyncio.get_running_loop().create_task(coro, context=context)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 async def _convert_pdf_to_docx(pdf_path: str, docx_path: str):
-    loop = asyncio.get_running_loop()
-    def _blocking_convert():
-        cv = Converter(pdf_path)
+    """Convert a PDF on the conversion engine and wait for it to finish"""
+    job = await conversion_engine.wait(conversion_engine.submit(pdf_path, docx_path))
+    _observe_conversion(job)
+    if job.status == TIMEOUT:
+        raise asyncio.TimeoutError()
+    if job.status != DONE:
+        raise RuntimeError(job.error or job.status)
+    return job
+
+def _observe_conversion(job):
+    """Record a finished job's queue wait and conversion time"""
+    if job.started_at is None:
+        return
+    metrics.conversion_queue_seconds.observe(job.started_at - job.created_at)
+    metrics.record_stage("conversion_queue", job.started_at - job.created_at)
+    if job.finished_at is not None:
+        metrics.conversion_seconds.observe(job.finished_at - job.started_at, status=job.status)
+        metrics.record_stage("conversion", job.finished_at - job.started_at)
+
+async def _finish_conversion(job, stored, session_id: Optional[str]):
+    """Wait for an upload's conversion job and make the result the session's current document"""
+    await conversion_engine.wait(job)
+    _observe_conversion(job)
+    if job.status == DONE:
+        try:
+            await io_executor.run(
+                dedup_index.add, stored.sha256, job.docx_path, stored.size, job.finished_at - job.started_at
+            )
+        except Exception:
+            logger.exception("Error indexing conversion for dedup")
+        _process_in_background(job.docx_path)
+        # Remove source PDF so only final .docx remains
         try:
-            cv.convert(docx_path)
-        finally:
-            cv.close()
-    # Run the blocking conversion in a thread to avoid blocking the event loop
-    await loop.run_in_executor(None, _blocking_convert)
+            os.remove(job.pdf_path)
+        except Exception:
+            pass
+        # Set as current document (batch uploads pass no session)
+        if session_id is not None:
+            await session_store.set_current_document(session_id, os.path.basename(job.docx_path))
+    else:
+        # Failed, timed out or cancelled: drop the source PDF and whatever stands at the .docx name
+        _remove_quietly(job.pdf_path)
+        _remove_quietly(job.docx_path)
+    return job
 
-def _modify_document(doc_path: str, modification_prompt: str, groq_client):
-    """Modify the document based on the AI prompt"""
-    try:
-        # Read the current document
-        doc = Document(doc_path)
-        
-        # Extract current content for context
-        current_content = []
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                current_content.append(paragraph.text)
+MODIFICATION_SYSTEM_PROMPT = """You are an expert resume editor. You will receive a document and modification instructions.
+        The document is given as one block per line in the form "[id] text". Ids like p3 are paragraphs;
+        ids like t0r1c2 are table cells (table 0, row 1, column 2).
         
-        # Create a comprehensive prompt for the AI
-        system_prompt = """You are an expert resume editor. You will receive a document and modification instructions. 
-        You must modify the document according to the instructions while maintaining the original structure and formatting.
-        
-        IMPORTANT: You must return ONLY the modified content in JSON format with this exact structure:
+        IMPORTANT: You must return ONLY a JSON list of patch operations with this exact structure:
         {
-            "paragraphs": ["modified paragraph 1", "modified paragraph 2", ...],
-            "tables": [
-                {
-                    "rows": [
-                        ["cell1", "cell2", ...],
-                        ["cell1", "cell2", ...]
-                    ]
-                }
+            "operations": [
+                {"op": "replace", "id": "p3", "text": "new text for block p3"},
+                {"op": "insert_after", "id": "p3", "text": "new paragraph placed after block p3"},
+                {"op": "delete", "id": "p5"}
             ]
         }
         
-        If there are no tables, return empty array for tables. Preserve the logical flow and professional tone."""
-        
-        user_prompt = f"""Current document content:
-{chr(10).join(current_content)}
+        Only include blocks that actually change; never repeat unchanged text. Return an empty list if nothing
+        needs to change. Preserve the logical flow and professional tone."""
+
+# Bump these whenever the matching system prompt changes, so cached responses are not replayed
+MODIFICATION_PROMPT_VERSION = "patch-v1"
+CHAT_PROMPT_VERSION = "chat-v1"
+
+CHAT_SYSTEM_PROMPT = "You are a helpful assistant for resume editing. You can help users modify their resumes and provide guidance on resume writing best practices."
+
+def _load_docx(doc_path: str, purpose: str):
+    """Open a DOCX with python-docx (imported on first use), timing the load"""
+    from docx import Document
+    with timed(metrics.docx_load_seconds, "docx_load", purpose=purpose):
+        return Document(doc_path)
+
+def _save_docx(doc, doc_path: str):
+    """Save a DOCX through a temp file in the same folder, so readers never see a half-written one"""
+    tmp = f"{doc_path}.{uuid.uuid4().hex}.part"
+    try:
+        with timed(metrics.docx_save_seconds, "docx_save"):
+            doc.save(tmp)
+        os.replace(tmp, doc_path)
+    except BaseException:
+        _remove_quietly(tmp)
+        raise
+
+def _index_document(doc_path: str):
+    """Build and store the section index of a document"""
+    # Hash before loading: if the file changes in between, the index is tagged stale rather than wrong
+    sha256 = extraction_cache.content_hash(doc_path)
+    index = build_index(_load_docx(doc_path, "index"), sha256)
+    save_index(SECTION_INDEX_FOLDER, doc_path, index)
+    return index
+
+def _process_document(doc_path: str):
+    """Build the section index and the preview rendering of a document from one load"""
+    sha256 = extraction_cache.content_hash(doc_path)
+    try:
+        doc = _load_docx(doc_path, "index")
+        save_index(SECTION_INDEX_FOLDER, doc_path, build_index(doc, sha256))
+    except Exception:
+        prerenderer.render_failed(doc_path, sha256)
+        raise
+    with timed(metrics.prerender_seconds, "prerender"):
+        prerenderer.render(doc_path, sha256, doc)
+
+def _process_in_background(doc_path: str):
+    """Index and pre-render a new document version off the request path.
+
+    Chat rebuilds a missing index on demand; previews report `pending` until the rendering is written.
+    Returns the rendering status for the response.
+    """
+    prerenderer.mark_pending(doc_path)
+    async def process():
+        try:
+            await background_executor.run(_process_document, doc_path, shed=False)
+        except Exception:
+            logger.exception("Error indexing or rendering %s", doc_path)
+    _spawn(process())
+    return _rendering_link(os.path.basename(doc_path), PENDING)
+
+def _rendering_link(filename: str, status: str):
+    return {"status": status, "url": f"/documents/{filename}/rendering"}
+
+def _modification_scope(doc_path: str, modification_prompt: str):
+    """Block IDs of the sections the request is about, or None to send the whole document"""
+    index = load_index(SECTION_INDEX_FOLDER, doc_path, extraction_cache.content_hash(doc_path)) or _index_document(doc_path)
+    block_ids = select_block_ids(index, modification_prompt)
+    metrics.modification_scope.inc(scope="full" if block_ids is None else "sections")
+    return block_ids
+
+def _build_modification_messages(doc_path: str, modification_prompt: str, block_ids: Optional[set] = None):
+    """Build the LLM messages for a modification request against the document (or only `block_ids` of it)"""
+    # Read the current document as "[id] text" blocks the model can patch
+    doc = _load_docx(doc_path, "prompt")
+    current_content = render_blocks(doc, block_ids)
+    
+    scope_note = ""
+    if block_ids is not None:
+        scope_note = "Only the sections relevant to the request are shown; only patch the blocks listed.\n\n"
+    user_prompt = f"""{scope_note}Current document content:
+{current_content}
 
 Modification request: {modification_prompt}
 
-Please modify the document according to the request and return the updated content in the specified JSON format."""
+Please return the patch operations that apply the request, in the specified JSON format."""
+    
+    return [
+        {"role": "system", "content": MODIFICATION_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _parse_operations(ai_response: str):
+    """Extract the list of patch operations from the AI's response"""
+    # Extract JSON from the response (sometimes AI adds extra text)
+    json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+    if not json_match:
+        raise ValueError("No JSON found in AI response")
+    operations = json.loads(json_match.group())["operations"]
+    if not isinstance(operations, list):
+        raise ValueError("'operations' must be a list")
+    return operations
+
+def _apply_modification_response(doc_path: str, ai_response: str, block_ids: Optional[set] = None):
+    """Patch the document in place from the AI's JSON response, touching only `block_ids` when given"""
+    try:
+        with timed(metrics.llm_response_parse_seconds, "llm_parse"):
+            operations = _parse_operations(ai_response)
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Error parsing AI response: %s; AI response: %r", e, ai_response)
+        return False
+    if block_ids is not None:
+        # IDs are document-wide, so edits to the shown sections merge back as they are
+        operations = [op for op in operations if isinstance(op, dict) and op.get("id") in block_ids]
+    if not operations:
+        # Nothing to change: no snapshot, no save, and the response is not cached
+        logger.warning("AI response has no patch operation for the document: %r", ai_response)
+        return False
+    
+    doc = _load_docx(doc_path, "patch")
+    result = apply_operations(doc, operations)
+    if not result["applied"]:
+        logger.warning("No AI patch operation could be applied: %r", ai_response)
+        return False
+    
+    # Keep the pre-edit content so the modification can be rolled back
+    with timed(metrics.version_snapshot_seconds, "snapshot"):
+        version_store.snapshot(os.path.basename(doc_path), doc_path, "modify")
+    
+    # Save the modified document
+    _save_docx(doc, doc_path)
+    extraction_cache.invalidate(doc_path)
+    return True
+
+def _modify_document(doc_path: str, modification_prompt: str, groq_client):
+    """Modify the document based on the AI prompt using a synchronous Groq client"""
+    try:
+        block_ids = _modification_scope(doc_path, modification_prompt)
+        messages = _build_modification_messages(doc_path, modification_prompt, block_ids)
         
         # Get AI response
         chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model="llama-3.3-70b-versatile",
+            messages=messages,
+            model=DEFAULT_MODEL,
         )
         
-        ai_response = chat_completion.choices[0].message.content
-        
-        # Parse AI response
-        try:
-            # Extract JSON from the response (sometimes AI adds extra text)
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-            if json_match:
-                modifications = json.loads(json_match.group())
-            else:
-                raise ValueError("No JSON found in AI response")
-            
-            # Clear existing content
-            doc._element.clear()
-            
-            # Add modified paragraphs
-            for para_text in modifications.get("paragraphs", []):
-                if para_text.strip():
-                    doc.add_paragraph(para_text)
-            
-            # Add modified tables
-            for table_data in modifications.get("tables", []):
-                if table_data.get("rows"):
-                    table = doc.add_table(rows=len(table_data["rows"]), cols=len(table_data["rows"][0]))
-                    for i, row_data in enumerate(table_data["rows"]):
-                        for j, cell_data in enumerate(row_data):
-                            if i < len(table.rows) and j < len(table.rows[i].cells):
-                                table.rows[i].cells[j].text = str(cell_data)
+        return _apply_modification_response(doc_path, chat_completion.choices[0].message.content, block_ids)
             
-            # Save the modified document
-            doc.save(doc_path)
-            return True
-            
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
-            print(f"Error parsing AI response: {e}")
-            print(f"AI Response: {ai_response}")
-            return False
-            
-    except Exception as e:
-        print(f"Error modifying document: {e}")
+    except Exception:
+        logger.exception("Error modifying document")
+        return False
+
+def _llm_cache_key(prompt: str, doc_path, model: str, prompt_version: str):
+    """Cache key for an LLM response; doc_path is None for requests that don't include a document"""
+    document_hash = extraction_cache.content_hash(doc_path) if doc_path else ""
+    return llm_cache.key(prompt, document_hash, model, prompt_version)
+
+async def _cached_response(cache_key: str, use_cache: bool):
+    """Look up a cached LLM response, or None on a miss or when the cache is bypassed"""
+    if not use_cache:
+        llm_cache.record_bypass()
+        return None
+    return await llm_executor.run(llm_cache.get, cache_key)
+
+async def _modify_document_async(doc_path: str, modification_prompt: str, llm: LLMClient, use_cache: bool = True):
+    """Modify the document based on the AI prompt without blocking the event loop"""
+    try:
+        cache_key = await io_executor.run(
+            _llm_cache_key, modification_prompt, doc_path, llm.model, MODIFICATION_PROMPT_VERSION
+        )
+        ai_response = await _cached_response(cache_key, use_cache)
+        from_cache = ai_response is not None
+        block_ids = await parse_executor.run(_modification_scope, doc_path, modification_prompt)
+        if not from_cache:
+            messages = await parse_executor.run(_build_modification_messages, doc_path, modification_prompt, block_ids)
+            chat_completion = await llm.complete(messages)
+            ai_response = chat_completion.choices[0].message.content
+        
+        # Cached and fresh responses are applied the same way; only responses that applied are cached
+        success = await parse_executor.run(_apply_modification_response, doc_path, ai_response, block_ids)
+        if success:
+            # Re-index and re-render off the request path; a chat arriving first rebuilds the stale index itself
+            _process_in_background(doc_path)
+        if success and not from_cache:
+            await llm_executor.run(llm_cache.put, cache_key, ai_response, shed=False)
+        return success
+    except ExecutorSaturated:
+        raise
+    except Exception:
+        logger.exception("Error modifying document")
         return False
 
+async def _chat_answer(message: str, llm: LLMClient, use_cache: bool = True):
+    """Answer a general question, from the response cache when possible"""
+    cache_key = _llm_cache_key(message, None, llm.model, CHAT_PROMPT_VERSION)
+    answer = await _cached_response(cache_key, use_cache)
+    if answer is None:
+        chat_completion = await llm.complete(_chat_messages(message))
+        answer = chat_completion.choices[0].message.content
+        await llm_executor.run(llm_cache.put, cache_key, answer, shed=False)
+    return answer
+
 class ChatRequest(BaseModel):
     message: str
+    stream: bool = False
 
-@app.post("/chat")
-async def chat_endpoint(chat: ChatRequest):
-    groq_key = os.getenv("GROQ_API_KEY")
-    if not groq_key:
-        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured on server")
+# Messages mentioning any of these are treated as document modification requests
+MODIFICATION_KEYWORDS = [
+    "modify", "edit", "change", "update", "improve", "rewrite", 
+    "resume", "document", "cv", "curriculum vitae"
+]
+
+def _is_modification_request(message: str):
+    return any(keyword in message.lower() for keyword in MODIFICATION_KEYWORDS)
+
+def _chat_messages(message: str):
+    return [
+        {
+            "role": "system",
+            "content": CHAT_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": message,
+        }
+    ]
+
+def _modification_result(filename: str, doc_path: str, success: bool):
+    """Build the /chat response for a finished modification attempt"""
+    if not success:
+        return {
+            "response": "I encountered an error while modifying the document. Please try again with a clearer instruction.",
+            "document_modified": False
+        }
     
+    # After successful modification, get the updated preview content
     try:
-        client = Groq(api_key=groq_key)
+        # Read the updated document content
+        with timed(metrics.preview_read_seconds, "preview_read", kind="full"):
+            extracted = extraction_cache.get(doc_path)
+        updated_content = [p for p in extracted.paragraphs if p.strip()]
         
-        # Check if this is a document modification request
-        modification_keywords = [
-            "modify", "edit", "change", "update", "improve", "rewrite", 
-            "resume", "document", "cv", "curriculum vitae"
-        ]
+        # Extract table content
+        table_content = [" | ".join(row) for row in extracted.table_rows]
         
-        is_modification_request = any(keyword in chat.message.lower() for keyword in modification_keywords)
+        # Combine all content
+        full_content = "\n".join(updated_content)
+        if table_content:
+            full_content += "\n\nTables:\n" + "\n".join(table_content)
         
-        if is_modification_request and CURRENT_DOCUMENT:
-            # This is a document modification request
-            doc_path = os.path.join(UPLOAD_FOLDER, CURRENT_DOCUMENT)
+        return {
+            "response": f"Document '{filename}' has been successfully modified according to your request. Here's the updated content:",
+            "document_modified": True,
+            "filename": filename,
+            "updated_content": full_content[:10000],  # Limit content length
+            "content_type": "docx"
+        }
+        
+    except Exception as e:
+        # If preview generation fails, still return success but without content
+        return {
+            "response": f"Document '{filename}' has been successfully modified according to your request. You can now preview the updated document.",
+            "document_modified": True,
+            "filename": filename,
+            "updated_content": None,
+            "content_type": "docx"
+        }
+
+NO_ACTIVE_DOCUMENT_RESPONSE = {
+    "response": "No active document found to modify. Please upload a document first.",
+    "document_modified": False
+}
+
+@asynccontextmanager
+async def _document_lock(filename: str):
+    """Hold the document's modification lock, recording how long it took to get"""
+    start = time.perf_counter()
+    async with session_store.document_lock(filename, DOCUMENT_LOCK_TIMEOUT):
+        waited = time.perf_counter() - start
+        metrics.document_lock_wait_seconds.observe(waited)
+        metrics.record_stage("lock_wait", waited)
+        yield
+
+def _in_scope(operation, block_ids: Optional[set]):
+    """Whether a streamed operation targets a block that was shown to the model"""
+    return block_ids is None or (isinstance(operation, dict) and operation.get("id") in block_ids)
+
+def _sse(event: str, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_chat(message: str, client: LLMClient, session_id: str, use_cache: bool = True):
+    """Server-sent events for /chat.
+
+    Plain answers arrive as `token` events. Modifications emit an `operation` event for
+    each patch operation as soon as the model finishes it, then the document is
+    patched and saved. Both end with a `done` event carrying the regular /chat response body.
+    """
+    try:
+        filename = await session_store.get_current_document(session_id)
+        if _is_modification_request(message) and filename:
+            doc_path = os.path.join(UPLOAD_FOLDER, filename)
+            if not os.path.exists(doc_path):
+                yield _sse("done", NO_ACTIVE_DOCUMENT_RESPONSE)
+                return
             
-            if os.path.exists(doc_path):
-                # Modify the document
-                success = await asyncio.get_running_loop().run_in_executor(
-                    None, _modify_document, doc_path, chat.message, client
+            async with _document_lock(filename):
+                cache_key = await io_executor.run(
+                    _llm_cache_key, message, doc_path, client.model, MODIFICATION_PROMPT_VERSION
                 )
+                cached = await _cached_response(cache_key, use_cache)
+                block_ids = await parse_executor.run(_modification_scope, doc_path, message)
+                parser = JSONArrayStream("operations")
+                if cached is not None:
+                    # Replay the cached response through the same parser and apply path
+                    for operation in parser.feed(cached):
+                        if _in_scope(operation, block_ids):
+                            yield _sse("operation", operation)
+                else:
+                    messages = await parse_executor.run(_build_modification_messages, doc_path, message, block_ids)
+                    async for delta in client.stream(messages):
+                        for operation in parser.feed(delta):
+                            if _in_scope(operation, block_ids):
+                                yield _sse("operation", operation)
                 
+                success = await parse_executor.run(_apply_modification_response, doc_path, parser.buffer, block_ids)
                 if success:
-                    # After successful modification, get the updated preview content
-                    try:
-                        # Read the updated document content
-                        doc = Document(doc_path)
-                        updated_content = []
-                        
-                        # Extract paragraphs
-                        for paragraph in doc.paragraphs:
-                            if paragraph.text.strip():
-                                updated_content.append(paragraph.text)
-                        
-                        # Extract table content
-                        table_content = []
-                        for table in doc.tables:
-                            for row in table.rows:
-                                row_text = [cell.text for cell in row.cells]
-                                table_content.append(" | ".join(row_text))
-                        
-                        # Combine all content
-                        full_content = "\n".join(updated_content)
-                        if table_content:
-                            full_content += "\n\nTables:\n" + "\n".join(table_content)
-                        
-                        return {
-                            "response": f"Document '{CURRENT_DOCUMENT}' has been successfully modified according to your request. Here's the updated content:",
-                            "document_modified": True,
-                            "filename": CURRENT_DOCUMENT,
-                            "updated_content": full_content[:10000],  # Limit content length
-                            "content_type": "docx"
-                        }
-                        
-                    except Exception as e:
-                        # If preview generation fails, still return success but without content
-                        return {
-                            "response": f"Document '{CURRENT_DOCUMENT}' has been successfully modified according to your request. You can now preview the updated document.",
-                            "document_modified": True,
-                            "filename": CURRENT_DOCUMENT,
-                            "updated_content": None,
-                            "content_type": "docx"
-                        }
-                else:
-                    return {
-                        "response": "I encountered an error while modifying the document. Please try again with a clearer instruction.",
-                        "document_modified": False
-                    }
+                    _process_in_background(doc_path)
+                if success and cached is None:
+                    await llm_executor.run(llm_cache.put, cache_key, parser.buffer, shed=False)
+            yield _sse("done", await parse_executor.run(_modification_result, filename, doc_path, success))
+        else:
+            cache_key = _llm_cache_key(message, None, client.model, CHAT_PROMPT_VERSION)
+            cached = await _cached_response(cache_key, use_cache)
+            if cached is not None:
+                yield _sse("token", {"delta": cached})
+                answer = cached
             else:
-                return {
-                    "response": "No active document found to modify. Please upload a document first.",
-                    "document_modified": False
-                }
+                parts = []
+                async for delta in client.stream(_chat_messages(message)):
+                    parts.append(delta)
+                    yield _sse("token", {"delta": delta})
+                answer = "".join(parts)
+                await llm_executor.run(llm_cache.put, cache_key, answer, shed=False)
+            yield _sse("done", {"response": answer, "document_modified": False})
+    except Exception as e:
+        yield _sse("error", {"detail": f"Chat error: {e}"})
+
+@app.post("/chat")
+async def chat_endpoint(
+    chat: ChatRequest,
+    session_id: str = Depends(get_session_id),
+    x_llm_cache: Optional[str] = Header(default=None),
+):
+    client = _get_llm_client()
+    # "X-LLM-Cache: bypass" forces a fresh LLM call (the fresh response still refreshes the cache)
+    use_cache = (x_llm_cache or "").lower() != "bypass"
+    
+    if chat.stream:
+        return StreamingResponse(
+            _stream_chat(chat.message, client, session_id, use_cache),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    
+    try:
+        filename = await session_store.get_current_document(session_id)
+        if _is_modification_request(chat.message) and filename:
+            # This is a document modification request
+            doc_path = os.path.join(UPLOAD_FOLDER, filename)
+            
+            if os.path.exists(doc_path):
+                # Modify the document; concurrent requests for the same document take turns
+                async with _document_lock(filename):
+                    success = await _modify_document_async(doc_path, chat.message, client, use_cache)
+                return await parse_executor.run(_modification_result, filename, doc_path, success)
+            else:
+                return NO_ACTIVE_DOCUMENT_RESPONSE
         else:
             # Regular chat response
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant for resume editing. You can help users modify their resumes and provide guidance on resume writing best practices."
-                    },
-                    {
-                        "role": "user",
-                        "content": chat.message,
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-            )
             return {
-                "response": chat_completion.choices[0].message.content,
+                "response": await _chat_answer(chat.message, client, use_cache),
                 "document_modified": False
             }
             
+    except LockTimeout as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {e}")
 
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    global CURRENT_DOCUMENT
-    original_filename = file.filename
+MAX_BULK_DOCUMENTS = int(os.getenv("MAX_BULK_DOCUMENTS", 200))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 4))
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", 3))
+BULK_RETRY_BACKOFF = float(os.getenv("BULK_RETRY_BACKOFF", 1.0))
+
+class BulkModifyRequest(BaseModel):
+    filenames: List[str]
+    prompt: str
+
+async def _bulk_modify_one(filename: str, prompt: str, client: LLMClient, slots: asyncio.Semaphore):
+    """Apply the prompt to one stored document, retrying failed attempts with exponential backoff"""
+    doc_path = os.path.join(UPLOAD_FOLDER, filename)
+    result = {"filename": filename}
+    if os.path.basename(filename) != filename or not filename.lower().endswith(".docx") \
+            or not os.path.exists(doc_path):
+        return {**result, "status": "not_found"}
+    
+    start = time.perf_counter()
+    async with slots:
+        for attempt in range(1, BULK_MAX_ATTEMPTS + 1):
+            detail = None
+            try:
+                async with _document_lock(filename):
+                    success = await _modify_document_async(doc_path, prompt, client)
+                if success:
+                    versions = await io_executor.run(version_store.list, filename, shed=False)
+                    return {**result, "status": "modified", "attempts": attempt,
+                            "previous_version": versions[0]["version"] if versions else None,
+                            "seconds": round(time.perf_counter() - start, 3)}
+                detail = "The document could not be modified"
+            except (ExecutorSaturated, LockTimeout) as e:
+                detail = str(e)
+            if attempt < BULK_MAX_ATTEMPTS:
+                await asyncio.sleep(BULK_RETRY_BACKOFF * 2 ** (attempt - 1))
+    return {**result, "status": "failed", "attempts": BULK_MAX_ATTEMPTS, "detail": detail,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+async def _run_bulk_modify(filenames: List[str], prompt: str, client: LLMClient):
+    """Yield each document's result as soon as its edit finishes.
+
+    At most BULK_CONCURRENCY documents are edited at once; the LLM client's rate
+    limiter spaces out the calls themselves, so a large batch runs at the provider's quota.
+    """
+    slots = asyncio.Semaphore(BULK_CONCURRENCY)
+    results = asyncio.Queue()
+    
+    async def modify(index: int, filename: str):
+        try:
+            result = await _bulk_modify_one(filename, prompt, client, slots)
+        except Exception as e:
+            logger.exception("Error in bulk modification of %s", filename)
+            result = {"filename": filename, "status": "failed", "detail": str(e)}
+        results.put_nowait({"index": index, **result})
+    
+    # Like batch uploads, the edits run to completion even if the client disconnects
+    for index, filename in enumerate(filenames):
+        _spawn(modify(index, filename))
+    for _ in range(len(filenames)):
+        yield await results.get()
+
+@app.post("/documents/bulk-modify")
+async def bulk_modify(request: BulkModifyRequest, stream: bool = False):
+    """Apply one modification prompt to many stored documents concurrently.
+
+    Returns per-document results in request order, or with `?stream=true` one NDJSON
+    line per document in completion order. Each edit is snapshotted like a chat edit,
+    so `previous_version` can be rolled back to.
+    """
+    if not request.filenames:
+        raise HTTPException(status_code=400, detail="No documents given")
+    if len(request.filenames) > MAX_BULK_DOCUMENTS:
+        raise HTTPException(status_code=413, detail=f"A bulk edit may cover at most {MAX_BULK_DOCUMENTS} documents")
+    if len(set(request.filenames)) != len(request.filenames):
+        raise HTTPException(status_code=400, detail="Duplicate filenames")
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt is empty")
+    client = _get_llm_client()
+    
+    if stream:
+        return StreamingResponse(
+            (json.dumps(result) + "\n" async for result in _run_bulk_modify(request.filenames, request.prompt, client)),
+            media_type="application/x-ndjson",
+        )
+    
+    results = sorted([result async for result in _run_bulk_modify(request.filenames, request.prompt, client)],
+                     key=lambda r: r["index"])
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"results": results, "summary": summary}
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _reserve_name(path: str) -> bool:
+    # O_EXCL: exactly one concurrent upload can create the placeholder
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        return True
+    except FileExistsError:
+        return False
+
+def _new_saved_filename(original_filename: str):
+    """Reserve a timestamped name for an upload and its converted .docx.
+
+    Both names are created as empty placeholders with O_EXCL, so concurrent uploads of the
+    same file never get the same name; the upload and conversion then replace them.
+    """
     name, ext = os.path.splitext(original_filename)
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    saved_filename = f"{name}-{timestamp}{ext}"
+    base_name = f"{name}-{timestamp}"
+    suffix = 1
+    while True:
+        paths = [os.path.join(UPLOAD_FOLDER, base_name + e) for e in dict.fromkeys((ext, ".docx"))]
+        reserved = []
+        for path in paths:
+            if not _reserve_name(path):
+                break
+            reserved.append(path)
+        if len(reserved) == len(paths):
+            return base_name + ext
+        for path in reserved:
+            _remove_quietly(path)
+        base_name = f"{name}-{timestamp}-{suffix}"
+        suffix += 1
+
+def _release_saved_filename(saved_filename: str):
+    """Remove an upload that was turned away, along with its reserved .docx name"""
+    base_name, ext = os.path.splitext(saved_filename)
+    for e in dict.fromkeys((ext, ".docx")):
+        _remove_quietly(os.path.join(UPLOAD_FOLDER, base_name + e))
+
+async def _save_upload(file: UploadFile, file_location: str):
+    """Stream an upload to disk, recording its size and how long storing it took"""
+    with timed(metrics.upload_write_seconds, "upload_write"):
+        stored = await save_upload(file, file_location, max_bytes=MAX_UPLOAD_BYTES, executor=io_executor)
+    metrics.upload_bytes.observe(stored.size)
+    return stored
+
+@app.post("/upload")
+async def upload_file(file: UploadFile = File(...), wait: bool = True, session_id: str = Depends(get_session_id)):
+    original_filename = os.path.basename(file.filename or "")
+    name, ext = os.path.splitext(original_filename)
+    try:
+        check_extension(original_filename)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    saved_filename = _new_saved_filename(original_filename)
     file_location = os.path.join(UPLOAD_FOLDER, saved_filename)
 
-    with open(file_location, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # Validate and stream to disk in chunks; nothing is left behind if the upload is rejected
+    try:
+        stored = await _save_upload(file, file_location)
+    except UploadRejected as e:
+        _release_saved_filename(saved_filename)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except BaseException:
+        _release_saved_filename(saved_filename)
+        raise
 
     # If uploaded file is a PDF, also convert to DOCX and save
-    # Only allow .pdf or .docx uploads
-    if ext.lower() not in [".pdf", ".docx"]:
-        raise HTTPException(status_code=400, detail="Only .pdf or .docx files are allowed")
 
     if ext.lower() == ".pdf":
-        try:
-            base_name = os.path.splitext(saved_filename)[0]
-            docx_filename = f"{base_name}.docx"
-            docx_location = os.path.join(UPLOAD_FOLDER, docx_filename)
+        base_name = os.path.splitext(saved_filename)[0]
+        docx_filename = f"{base_name}.docx"
+        docx_location = os.path.join(UPLOAD_FOLDER, docx_filename)
 
-            # Offload blocking conversion and apply a timeout guard
-            await asyncio.wait_for(_convert_pdf_to_docx(file_location, docx_location), timeout=120)
-
-            # Remove source PDF so only final .docx remains
+        # Byte-identical PDF converted before: hand out a fresh copy of that conversion
+        try:
+            reused = await io_executor.run(dedup_index.checkout, stored.sha256, docx_location)
+        except BaseException:
+            _release_saved_filename(saved_filename)
+            raise
+        if reused:
             try:
                 os.remove(file_location)
             except Exception:
                 pass
+            await session_store.set_current_document(session_id, docx_filename)
+            return {
+                "message": "File uploaded; reused the existing .docx conversion",
+                "saved_filename": docx_filename,
+                "deduplicated": True,
+                "rendering": _process_in_background(docx_location),
+            }
 
-            # Set as current document
-            CURRENT_DOCUMENT = docx_filename
-            
-            return {"message": "File uploaded and converted to .docx successfully", "saved_filename": docx_filename}
-        except asyncio.TimeoutError:
+        # Queue the conversion; reject when the engine is saturated instead of piling up work
+        try:
+            job = conversion_engine.submit(file_location, docx_location)
+        except QueueFull as e:
+            _release_saved_filename(saved_filename)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+        finishing = _spawn(_finish_conversion(job, stored, session_id))
+        if not wait:
+            return JSONResponse(status_code=202, content={
+                "message": "File uploaded, conversion queued",
+                "saved_filename": docx_filename,
+                "job_id": job.id,
+                "status": job.status,
+                "rendering": _rendering_link(docx_filename, PENDING),
+            })
+
+        # Shield so a client disconnect does not abandon the bookkeeping for a running job
+        await asyncio.shield(finishing)
+        if job.status == TIMEOUT:
             raise HTTPException(status_code=504, detail="Conversion timed out")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Conversion failed: {e}")
+        if job.status != DONE:
+            raise HTTPException(status_code=500, detail=f"Conversion failed: {job.error or job.status}")
+        return {"message": "File uploaded and converted to .docx successfully", "saved_filename": docx_filename, "job_id": job.id,
+                "rendering": _rendering_link(docx_filename, PENDING)}
 
     # If .docx, set as current document
     if ext.lower() == ".docx":
-        CURRENT_DOCUMENT = saved_filename
-        return {"message": "File uploaded successfully", "saved_filename": saved_filename}
+        await session_store.set_current_document(session_id, saved_filename)
+        return {"message": "File uploaded successfully", "saved_filename": saved_filename,
+                "rendering": _process_in_background(file_location)}
+
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 200))
+
+async def _batch_conversion_result(result: dict, job, stored):
+    """Wait for one batch file's conversion and describe how it ended"""
+    try:
+        await _finish_conversion(job, stored, None)
+    except Exception as e:
+        return {**result, "status": "failed", "job_id": job.id, "detail": str(e)}
+    result = {**result, "status": job.status, "job_id": job.id}
+    if job.status == DONE:
+        result["saved_filename"] = os.path.basename(job.docx_path)
+        result["rendering"] = _rendering_link(result["saved_filename"], PENDING)
+    else:
+        result["detail"] = job.error or job.status
+    return result
+
+async def _store_batch_file(file: UploadFile):
+    """Store one file of a batch; returns its result, or a task resolving to it once converted"""
+    original_filename = os.path.basename(file.filename or "")
+    result = {"filename": original_filename}
+    try:
+        ext = check_extension(original_filename)
+    except UploadRejected as e:
+        return {**result, "status": "rejected", "detail": e.detail}
+    saved_filename = _new_saved_filename(original_filename)
+    file_location = os.path.join(UPLOAD_FOLDER, saved_filename)
+    try:
+        stored = await _save_upload(file, file_location)
+    except UploadRejected as e:
+        _release_saved_filename(saved_filename)
+        return {**result, "status": "rejected", "detail": e.detail}
+    except BaseException:
+        _release_saved_filename(saved_filename)
+        raise
+    
+    if ext == ".docx":
+        return {**result, "status": DONE, "saved_filename": saved_filename,
+                "rendering": _process_in_background(file_location)}
+    
+    docx_filename = f"{os.path.splitext(saved_filename)[0]}.docx"
+    docx_location = os.path.join(UPLOAD_FOLDER, docx_filename)
+    try:
+        reused = await io_executor.run(dedup_index.checkout, stored.sha256, docx_location)
+        if not reused:
+            # Wait for room in the queue rather than rejecting part of the batch
+            job = await conversion_engine.submit_wait(file_location, docx_location)
+    except BaseException:
+        _release_saved_filename(saved_filename)
+        raise
+    if reused:
+        _remove_quietly(file_location)
+        return {**result, "status": DONE, "saved_filename": docx_filename, "deduplicated": True,
+                "rendering": _process_in_background(docx_location)}
+    
+    return _spawn(_batch_conversion_result(result, job, stored))
+
+async def _run_batch(files: List[UploadFile]):
+    """Yield each file's result as soon as it is known.
+
+    Files are stored one after another while their conversions already run on the
+    engine's worker processes, so the batch takes about as long as its share of the
+    slowest conversions per core rather than the sum of all of them.
+    """
+    results = asyncio.Queue()
+    
+    def failed(index: int, file: UploadFile, error: BaseException):
+        return {"index": index, "filename": os.path.basename(file.filename or ""), "status": "failed",
+                "detail": str(error) or type(error).__name__}
+    
+    def on_converted(task, index: int, file: UploadFile):
+        # Every file must produce exactly one result, or the consumer below waits forever
+        try:
+            results.put_nowait({"index": index, **task.result()})
+        except BaseException as e:
+            results.put_nowait(failed(index, file, e))
+    
+    async def store_all():
+        for index, file in enumerate(files):
+            try:
+                item = await _store_batch_file(file)
+            except Exception as e:
+                results.put_nowait(failed(index, file, e))
+                continue
+            if isinstance(item, dict):
+                results.put_nowait({"index": index, **item})
+            else:
+                item.add_done_callback(lambda task, index=index, file=file: on_converted(task, index, file))
+    
+    storing = _spawn(store_all(), inherit_context=True)
+    for _ in range(len(files)):
+        yield await results.get()
+    await storing
+
+@app.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...), stream: bool = False):
+    """Upload many files at once; PDFs are converted concurrently on the conversion engine.
+
+    Returns per-file results in upload order, or with `?stream=true` one NDJSON line per
+    file in completion order. Batch uploads do not change any session's current document.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {MAX_BATCH_FILES} files")
+    
+    if stream:
+        return StreamingResponse(
+            (json.dumps(result) + "\n" async for result in _run_batch(files)),
+            media_type="application/x-ndjson",
+        )
+    
+    results = sorted([result async for result in _run_batch(files)], key=lambda r: r["index"])
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"results": results, "summary": summary}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a conversion job"""
+    job = conversion_engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued conversion, or kill the worker running it"""
+    job = conversion_engine.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+PREVIEW_PAGE_SIZE = 10000
+MAX_PREVIEW_PAGE_SIZE = 100000
+
+def _preview_page(file_path: str, filename: str, cursor: Optional[str], limit: int):
+    """One page of a document's preview text; only the part of the file needed for it is parsed"""
+    _, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    if ext not in (".pdf", ".docx"):
+        raise HTTPException(status_code=400, detail="Preview supports only .pdf or .docx")
+    try:
+        with timed(metrics.preview_read_seconds, "preview_read", kind="window"):
+            window = extraction_cache.get_window(file_path, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid preview cursor")
+    return {
+        "filename": filename,
+        "type": ext[1:],
+        "content": window.content,
+        "next_cursor": window.next_cursor,
+        "has_more": window.next_cursor is not None,
+    }
 
 @app.get("/preview/{filename}")
-async def preview_file(filename: str):
+async def preview_file(
+    request: Request,
+    response: Response,
+    filename: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(PREVIEW_PAGE_SIZE, ge=1, le=MAX_PREVIEW_PAGE_SIZE),
+):
+    """Get a page of a document's text; pass the returned next_cursor to continue.
+
+    Answers 304 without reading the document when If-None-Match holds the page's ETag.
+    """
     file_path = os.path.join(UPLOAD_FOLDER, filename)
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    _, ext = os.path.splitext(filename)
-    ext = ext.lower()
-
+    etag = make_etag(await io_executor.run(extraction_cache.content_hash, file_path), filename, cursor, limit)
+    cached = not_modified(request.headers, etag)
+    if cached is not None:
+        return cached
     try:
-        if ext == ".pdf":
-            text = ""
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    text += page.get_text()
-            return {"filename": filename, "type": "pdf", "content": text[:10000]}
-        elif ext == ".docx":
-            doc = Document(file_path)
-            paragraphs = [p.text for p in doc.paragraphs if p.text]
-            content = "\n".join(paragraphs)
-            # Fallback: also try tables
-            if not content.strip() and getattr(doc, "tables", None):
-                rows = []
-                for table in doc.tables:
-                    for row in table.rows:
-                        cells_text = [cell.text for cell in row.cells]
-                        rows.append("\t".join(cells_text))
-                content = "\n".join(rows)
-            return {"filename": filename, "type": "docx", "content": content[:10000]}
-        else:
-            raise HTTPException(status_code=400, detail="Preview supports only .pdf or .docx")
-    except HTTPException:
+        page = await parse_executor.run(_preview_page, file_path, filename, cursor, limit)
+        response.headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        return page
+    except (HTTPException, ExecutorSaturated):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
 
 @app.get("/current-document")
-async def get_current_document():
-    """Get the currently active document filename"""
-    return {"current_document": CURRENT_DOCUMENT}
+async def get_current_document(session_id: str = Depends(get_session_id)):
+    """Get the session's currently active document filename"""
+    return {"current_document": await session_store.get_current_document(session_id)}
 
 @app.get("/current-preview")
-async def get_current_document_preview():
-    """Get the preview content of the currently active document"""
-    if not CURRENT_DOCUMENT:
+async def get_current_document_preview(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(PREVIEW_PAGE_SIZE, ge=1, le=MAX_PREVIEW_PAGE_SIZE),
+    session_id: str = Depends(get_session_id),
+):
+    """Get the preview content of the session's currently active document"""
+    current_document = await session_store.get_current_document(session_id)
+    if not current_document:
         raise HTTPException(status_code=404, detail="No active document found")
     
-    file_path = os.path.join(UPLOAD_FOLDER, CURRENT_DOCUMENT)
+    file_path = os.path.join(UPLOAD_FOLDER, current_document)
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Current document not found")
     
-    _, ext = os.path.splitext(CURRENT_DOCUMENT)
-    ext = ext.lower()
-    
+    # The ETag covers the document name too, so switching documents never yields a 304
+    etag = make_etag(
+        await io_executor.run(extraction_cache.content_hash, file_path), current_document, cursor, limit, "current")
+    cached = not_modified(request.headers, etag)
+    if cached is not None:
+        return cached
     try:
-        if ext == ".pdf":
-            text = ""
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    text += page.get_text()
-            return {
-                "filename": CURRENT_DOCUMENT, 
-                "type": "pdf", 
-                "content": text[:10000],
-                "is_current": True
-            }
-        elif ext == ".docx":
-            doc = Document(file_path)
-            paragraphs = [p.text for p in doc.paragraphs if p.text]
-            content = "\n".join(paragraphs)
-            
-            # Also extract table content
-            table_content = []
-            for table in doc.tables:
-                for row in table.rows:
-                    cells_text = [cell.text for cell in row.cells]
-                    table_content.append(" | ".join(cells_text))
-            
-            if table_content:
-                content += "\n\nTables:\n" + "\n".join(table_content)
-            
-            return {
-                "filename": CURRENT_DOCUMENT, 
-                "type": "docx", 
-                "content": content[:10000],
-                "is_current": True
-            }
-        else:
-            raise HTTPException(status_code=400, detail="Preview supports only .pdf or .docx")
+        page = {**await parse_executor.run(_preview_page, file_path, current_document, cursor, limit), "is_current": True}
+        response.headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        return page
+    except (HTTPException, ExecutorSaturated):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not read current document: {e}")
 
 @app.get("/download/{filename}")
-async def download_file(filename: str):
+async def download_file(filename: str, request: Request):
+    """Download a file; supports If-None-Match (304) and single byte-range requests (206)"""
     file_path = os.path.join(UPLOAD_FOLDER, filename)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found/") 
-    return FileResponse(path=file_path, filename=filename, media_type="application/octet-stream")
+    etag = make_etag(await io_executor.run(extraction_cache.content_hash, file_path))
+    return file_response(file_path, request.headers, etag, filename, run=io_executor.run)
+
+def _document_path(filename: str):
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    if not filename.lower().endswith(".docx") or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return file_path
+
+@app.get("/documents/{filename}/rendering")
+async def get_rendering(filename: str):
+    """Status of the document's pre-rendered preview, and its static URLs once ready"""
+    file_path = _document_path(filename)
+    sha256 = await io_executor.run(extraction_cache.content_hash, file_path)
+    status = await io_executor.run(prerenderer.status, file_path, sha256)
+    result = {"filename": filename, "sha256": sha256, "status": status}
+    if status == READY:
+        manifest = await io_executor.run(prerenderer.manifest, sha256)
+        base = f"/previews/{sha256}"
+        result.update({
+            "html": f"{base}/index.html",
+            "pages": manifest["pages"],
+            "thumbnails": [f"{base}/page-{n}.png" for n in range(1, manifest["thumbnails"] + 1)],
+        })
+    return result
+
+@app.get("/documents/{filename}/versions")
+async def list_versions(filename: str):
+    """Snapshots of the document taken before each modification, newest first"""
+    _document_path(filename)
+    return {"filename": filename, "versions": await io_executor.run(version_store.list, filename)}
+
+@app.get("/documents/{filename}/versions/{version}/diff")
+async def diff_version(filename: str, version: int, against: str = "current"):
+    """Text diff from a version to another version (`against=<number>`) or to the current document"""
+    file_path = _document_path(filename)
+    if against != "current" and not against.isdigit():
+        raise HTTPException(status_code=400, detail="'against' must be a version number or 'current'")
+    try:
+        return await parse_executor.run(
+            version_store.diff, filename, version, file_path, None if against == "current" else int(against))
+    except VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/documents/{filename}/versions/{version}/rollback")
+async def rollback_version(filename: str, version: int):
+    """Restore a version; the content being replaced is snapshotted first, so a rollback can be undone"""
+    file_path = _document_path(filename)
+    try:
+        async with _document_lock(filename):
+            saved = await io_executor.run(version_store.rollback, filename, version, file_path)
+            extraction_cache.invalidate(file_path)
+    except VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LockTimeout as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    _process_in_background(file_path)
+    return {"filename": filename, "restored": version, "previous": saved}
+
+def _collect_stats():
+    return {
+        "extraction_cache": extraction_cache.stats(),
+        "conversion": conversion_engine.stats(),
+        "dedup": dedup_index.stats(),
+        "llm": llm_client.stats() if llm_client else None,
+        "llm_cache": llm_cache.stats(),
+        "versions": version_store.stats(),
+        "prerender": prerenderer.stats(),
+        "executors": {executor.name: executor.stats() for executor in EXECUTORS},
+    }
+
+@app.get("/stats")
+async def get_stats():
+    """Report cache and storage counters"""
+    # Several counters come from SQLite, so collect them off the event loop
+    return await io_executor.run(_collect_stats)
+
+def _executor_queue_depth():
+    """Work waiting for or running on the conversion engine and each thread pool"""
+    conversion = conversion_engine.stats()
+    depth = {
+        ("conversion", "queued"): conversion["queued"],
+        ("conversion", "running"): conversion["running"],
+    }
+    for executor in EXECUTORS:
+        for state, value in executor.depth().items():
+            depth[(executor.name, state)] = value
+    return depth
+
+metrics.registry.gauge(
+    "resume_executor_queue_depth", "Jobs waiting in or running on each executor", _executor_queue_depth,
+    ["executor", "state"])
+
+@app.get("/ready")
+async def readiness():
+    """Which engines are loaded; 200 once every engine in WARM_UP_ENGINES is warm, 503 before that"""
+    statuses = engines.status()
+    ready_workers = conversion_engine.workers_ready()
+    statuses["conversion"] = {"warm": ready_workers == conversion_engine.workers, "workers_ready": ready_workers}
+    ready = all(statuses[name]["warm"] for name in WARM_UP_ENGINES if name in statuses)
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "engines": statuses})
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,297 @@
+"""
+In-process metrics in the Prometheus text format, and per-request stage timings for the slow-request log
+"""
+
+import contextvars
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 512 * 1024, 1024 ** 2, 5 * 1024 ** 2, 20 * 1024 ** 2, 100 * 1024 ** 2)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    @abstractmethod
+    def _samples(self):
+        """Yield the metric's sample lines"""
+
+
+class Counter(_Metric):
+    """Monotonically increasing total per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Current value read from a callback at scrape time, e.g. a queue depth"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _samples(self):
+        for key, value in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with a running sum and count per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts..., sum, count]
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-2])}"
+            yield f"{self.name}_count{labels} {series[-1]}"
+
+
+class Registry:
+    """A named set of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add `metric`, or return the one already registered under its name if it is the same kind"""
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, callback, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, callback, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "resume_http_request_seconds", "Time to serve an HTTP request, including streamed bodies",
+    ["method", "handler", "status"])
+upload_bytes = registry.histogram(
+    "resume_upload_bytes", "Bytes read from the client and written to disk per stored upload",
+    buckets=BYTES_BUCKETS)
+upload_write_seconds = registry.histogram(
+    "resume_upload_write_seconds", "Time to stream an upload to disk and validate it")
+conversion_seconds = registry.histogram(
+    "resume_conversion_seconds", "PDF to DOCX conversion time on a worker process", ["status"])
+conversion_queue_seconds = registry.histogram(
+    "resume_conversion_queue_seconds", "Time a conversion job waited for a free worker")
+llm_request_seconds = registry.histogram(
+    "resume_llm_request_seconds", "LLM call latency including retries and waiting for a concurrency slot",
+    ["mode", "outcome"])
+llm_first_token_seconds = registry.histogram(
+    "resume_llm_first_token_seconds", "Time until a streamed LLM completion produced its first text")
+llm_tokens = registry.histogram(
+    "resume_llm_tokens", "Tokens per LLM call as reported by the API", ["type"], buckets=TOKEN_BUCKETS)
+llm_response_parse_seconds = registry.histogram(
+    "resume_llm_response_parse_seconds", "Time to extract and decode patch operations from an LLM response")
+docx_load_seconds = registry.histogram(
+    "resume_docx_load_seconds", "python-docx Document() load time", ["purpose"])
+docx_save_seconds = registry.histogram(
+    "resume_docx_save_seconds", "python-docx save time")
+version_snapshot_seconds = registry.histogram(
+    "resume_version_snapshot_seconds", "Time to snapshot a document before modifying it")
+prerender_seconds = registry.histogram(
+    "resume_prerender_seconds", "Time to render a document's HTML preview and page thumbnails")
+preview_read_seconds = registry.histogram(
+    "resume_preview_read_seconds", "Time to read preview text, cache hits included", ["kind"])
+modification_scope = registry.counter(
+    "resume_modification_scope_total", "Modification prompts built from matching sections or the whole document",
+    ["scope"])
+document_lock_wait_seconds = registry.histogram(
+    "resume_document_lock_wait_seconds", "Time a modification waited for the document lock")
+executor_wait_seconds = registry.histogram(
+    "resume_executor_wait_seconds", "Time blocking calls waited for a thread in each executor", ["executor"])
+executor_rejected = registry.counter(
+    "resume_executor_rejected_total", "Calls shed because the executor's queue was full", ["executor"])
+slow_requests = registry.counter(
+    "resume_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS", ["handler"])
+
+
+# Stage timings of the request being served, shared with executor threads via copied contexts
+_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_stages", default=None)
+
+
+def begin_request() -> contextvars.Token:
+    """Start collecting stage timings for the current request"""
+    return _stages.set({})
+
+
+def end_request(token: contextvars.Token) -> Dict[str, float]:
+    """Stop collecting and return {stage: seconds} for the request"""
+    stages = _stages.get() or {}
+    _stages.reset(token)
+    return stages
+
+
+def record_stage(stage: str, seconds: float):
+    """Add time to a stage of the current request, if one is being traced"""
+    stages = _stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(histogram: Histogram, stage: str, **labels):
+    """Observe the block's duration in `histogram` and count it towards the request's `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **labels)
+        record_stage(stage, elapsed)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every request until its last body chunk is sent (so streamed
+    responses count in full) and logging requests slower than `slow_seconds` with their stages"""
+
+    def __init__(self, app, slow_seconds: float = 0.0, logger=None):
+        self.app = app
+        self.slow_seconds = slow_seconds
+        self.logger = logger
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = begin_request()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            stages = end_request(token)
+            # The router stores the matched endpoint in the scope; label by its name to keep cardinality low
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "other")
+            http_request_seconds.observe(elapsed, method=scope["method"], handler=handler, status=status)
+            if self.slow_seconds and elapsed >= self.slow_seconds:
+                slow_requests.inc(handler=handler)
+                if self.logger is not None:
+                    self.logger.warning("Slow request %s %s -> %s in %.3fs [%s]", scope["method"], scope["path"],
+                                        status, elapsed, format_stages(stages, elapsed))
+
+
+def format_stages(stages: Dict[str, float], total: float) -> str:
+    """"llm=2.100s docx_save=0.040s other=0.012s", slowest stage first"""
+    parts = [f"{stage}={seconds:.3f}s" for stage, seconds in sorted(stages.items(), key=lambda s: -s[1])]
+    parts.append(f"other={max(0.0, total - sum(stages.values())):.3f}s")
+    return " ".join(parts)
@@ -0,0 +1,245 @@
+"""
+Pre-rendered previews: a lightweight HTML rendering and PNG page thumbnails of each DOCX version.
+
+Renderings are written once per document content hash to `<folder>/<sha256>/`
+(index.html, page-<n>.png, manifest.json) and served as static files, so showing a
+preview is a file hit rather than a parse. The thumbnails are rendered from the HTML
+with PyMuPDF's Story layout, which approximates the document's flow, not Word's pagination.
+"""
+
+import html
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+from docpatch import CELL_ID, W, iter_blocks
+
+RENDER_CSS = """
+body { font-family: sans-serif; font-size: 10pt; line-height: 1.3; }
+h1 { font-size: 16pt; margin: 0 0 4pt 0; }
+h2 { font-size: 12pt; margin: 8pt 0 2pt 0; }
+p { margin: 0 0 3pt 0; }
+table { border-collapse: collapse; width: 100%; }
+td { border: 0.5pt solid #999; padding: 2pt; vertical-align: top; }
+"""
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+MISSING = "missing"
+
+
+def _heading_tag(paragraph_el) -> Optional[str]:
+    style = paragraph_el.find(f"{W}pPr/{W}pStyle")
+    name = (style.get(f"{W}val") if style is not None else "") or ""
+    if name.lower() == "title":
+        return "h1"
+    if name.lower().startswith("heading"):
+        return "h2"
+    return None
+
+
+def _runs_html(paragraph_el) -> str:
+    parts = []
+    for run in paragraph_el.iter(f"{W}r"):
+        text = "".join(
+            (t.text or "") if t.tag == f"{W}t" else "\t" if t.tag == f"{W}tab" else "\n"
+            for t in run if t.tag in (f"{W}t", f"{W}tab", f"{W}br", f"{W}cr")
+        )
+        if not text:
+            continue
+        text = html.escape(text).replace("\n", "<br>")
+        props = run.find(f"{W}rPr")
+        if props is not None and props.find(f"{W}b") is not None:
+            text = f"<b>{text}</b>"
+        if props is not None and props.find(f"{W}i") is not None:
+            text = f"<i>{text}</i>"
+        parts.append(text)
+    return "".join(parts)
+
+
+def render_html(doc) -> str:
+    """The document body as simple HTML; elements carry the patch protocol's block IDs"""
+    # Take the IDs from docpatch so merged cells are numbered exactly as the model sees them
+    ids = {}
+    for block_id, block in iter_blocks(doc):
+        ids[block._tc if CELL_ID.match(block_id) else block._p] = block_id
+    body = []
+    for el in doc.element.body.iterchildren():
+        if el.tag == f"{W}p":
+            tag = _heading_tag(el) or "p"
+            body.append(f'<{tag} id="{ids[el]}">{_runs_html(el) or "&nbsp;"}</{tag}>')
+        elif el.tag == f"{W}tbl":
+            rows = []
+            for row in el.findall(f"{W}tr"):
+                cells = []
+                for cell in row.findall(f"{W}tc"):
+                    content = "<br>".join(_runs_html(cell_p) for cell_p in cell.iter(f"{W}p"))
+                    # The continuation of a vertically merged cell has no ID of its own
+                    block_id = f' id="{ids[cell]}"' if cell in ids else ""
+                    cells.append(f"<td{block_id}>{content}</td>")
+                rows.append(f"<tr>{''.join(cells)}</tr>")
+            body.append(f"<table>{''.join(rows)}</table>")
+    return "\n".join(body)
+
+
+def render_thumbnails(body_html: str, folder: str, scale: float, max_pages: int) -> int:
+    """Lay the HTML out on A4 pages and write the first `max_pages` as page-<n>.png; returns the page count"""
+    import fitz
+
+    buffer = io.BytesIO()
+    writer = fitz.DocumentWriter(buffer)
+    story = fitz.Story(html=body_html, user_css=RENDER_CSS)
+    page_rect = fitz.paper_rect("a4")
+    more = True
+    while more:
+        device = writer.begin_page(page_rect)
+        more, _ = story.place(page_rect + (36, 36, -36, -36))
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+    with fitz.open("pdf", buffer.getvalue()) as pdf:
+        for number, page in enumerate(pdf, start=1):
+            if number > max_pages:
+                break
+            page.get_pixmap(matrix=fitz.Matrix(scale, scale)).save(os.path.join(folder, f"page-{number}.png"))
+        return pdf.page_count
+
+
+class Prerenderer:
+    """Renders and caches previews per content hash, bounded by bytes (oldest renderings go first).
+
+    Pending and failed states are tracked in-process; with several workers, another worker
+    reports `missing` for a rendering still in progress elsewhere.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 256 * 1024 * 1024, scale: float = 0.4, max_pages: int = 10):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.scale = scale
+        self.max_pages = max_pages
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = set()
+        self.rendered = 0
+        self.reused = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def manifest(self, sha256: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.folder, sha256, "manifest.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def mark_pending(self, doc_path: str):
+        with self._lock:
+            path = os.path.abspath(doc_path)
+            self._pending[path] = self._pending.get(path, 0) + 1
+
+    def status(self, doc_path: str, sha256: str) -> str:
+        if self.manifest(sha256) is not None:
+            return READY
+        with self._lock:
+            if os.path.abspath(doc_path) in self._pending:
+                return PENDING
+            return FAILED if sha256 in self._failed else MISSING
+
+    def render(self, doc_path: str, sha256: str, doc) -> dict:
+        """Render `doc` (the loaded DOCX at doc_path) unless this content was rendered before.
+
+        Ends one `mark_pending` of doc_path, whether or not it succeeds.
+        """
+        try:
+            manifest = self.manifest(sha256)
+            if manifest is not None:
+                self.reused += 1
+                return manifest
+            start = time.perf_counter()
+            target = os.path.join(self.folder, sha256)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.part"
+            os.makedirs(tmp, exist_ok=True)
+            try:
+                body_html = render_html(doc)
+                with open(os.path.join(tmp, "index.html"), "w", encoding="utf-8") as f:
+                    f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><style>{RENDER_CSS}</style>'
+                            f"</head><body>\n{body_html}\n</body></html>\n")
+                pages = render_thumbnails(body_html, tmp, self.scale, self.max_pages)
+                manifest = {
+                    "sha256": sha256,
+                    "pages": pages,
+                    "thumbnails": min(pages, self.max_pages),
+                    "seconds": round(time.perf_counter() - start, 3),
+                }
+                with open(os.path.join(tmp, "manifest.json"), "w") as f:
+                    json.dump(manifest, f)
+                try:
+                    os.rename(tmp, target)
+                except OSError:
+                    # Another worker rendered the same content first
+                    shutil.rmtree(tmp, ignore_errors=True)
+            except Exception:
+                shutil.rmtree(tmp, ignore_errors=True)
+                self._record_failure(sha256)
+                raise
+            with self._lock:
+                self._failed.discard(sha256)
+                self.rendered += 1
+            self._prune(keep=sha256)
+            return manifest
+        finally:
+            self._end_pending(doc_path)
+
+    def render_failed(self, doc_path: str, sha256: str):
+        """Record that doc_path could not be rendered before render() was reached"""
+        self._record_failure(sha256)
+        self._end_pending(doc_path)
+
+    def _record_failure(self, sha256: str):
+        with self._lock:
+            self._failed.add(sha256)
+            self.failures += 1
+
+    def _end_pending(self, doc_path: str):
+        with self._lock:
+            path = os.path.abspath(doc_path)
+            if self._pending.get(path, 0) > 1:
+                self._pending[path] -= 1
+            else:
+                self._pending.pop(path, None)
+
+    def _prune(self, keep: str):
+        entries = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.endswith(".part") or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            entries.append((os.path.getmtime(path), size, name, path))
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, name, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rendered": self.rendered,
+                "reused": self.reused,
+                "failures": self.failures,
+                "evictions": self.evictions,
+                "pending": len(self._pending),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,95 @@
+"""
+Request and token rate limits for LLM calls, as token buckets refilled continuously
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+# Rough prompt size without a tokenizer: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+def estimate_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    """Upper-bound guess of a call's total tokens: the prompt plus its completion budget"""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in messages if isinstance(m, dict))
+    return prompt_chars // CHARS_PER_TOKEN + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        # A call bigger than the whole bucket waits until it is full, then overdraws it
+        return max(0.0, min(amount, self.capacity) - self.level) / self.rate
+
+
+class RateLimiter:
+    """Admit LLM calls within `requests_per_minute` and `tokens_per_minute` (0 disables either limit).
+
+    `acquire()` charges a call's estimated tokens up front; `settle()` corrects the
+    token bucket once the API reports the actual usage.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = _Bucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = _Bucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until one request of `tokens` tokens fits in both limits, then take it"""
+        if not self.enabled:
+            return
+        # Callers queue on the lock, so they are admitted in arrival order
+        async with self._lock:
+            waited = 0.0
+            while True:
+                now = time.monotonic()
+                delay = 0.0
+                for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill(now)
+                        delay = max(delay, bucket.wait_for(amount))
+                if delay <= 0:
+                    break
+                waited += delay
+                await asyncio.sleep(delay)
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= tokens
+            self.acquired += 1
+            if waited:
+                self.throttled += 1
+                self.throttled_seconds += waited
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Refund (or charge) the difference between a call's estimated and reported tokens"""
+        if self.tokens is None or actual is None:
+            return
+        self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated - actual)
+
+    def stats(self) -> dict:
+        return {
+            "requests_per_minute": self.requests.capacity if self.requests else 0,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else 0,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
@@ -0,0 +1,204 @@
+"""
+Section index of a DOCX resume: headings mapped to the block IDs under them, plus term counts for lookup.
+
+The index is stored in a private folder as `<name>.docx.sections.json` and tagged
+with the document's sha256, so a stale index is detected and rebuilt. At chat time
+`select_block_ids` picks the sections a request is about (heading matches first,
+then TF-IDF over section text) so only those blocks are sent to the model; block
+IDs are the global docpatch IDs, so the returned operations merge straight back.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from docpatch import CELL_ID, W, iter_blocks
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".sections.json"
+
+# Section names resumes commonly use, recognised even without a heading style
+KNOWN_SECTIONS = {
+    "summary", "profile", "objective", "about", "about me", "experience", "work experience",
+    "professional experience", "employment", "employment history", "education", "skills",
+    "technical skills", "projects", "certifications", "certificates", "awards", "achievements",
+    "publications", "languages", "interests", "hobbies", "volunteering", "references", "contact",
+}
+# Query words that map onto a section name
+ALIASES = {
+    "work": "experience", "job": "experience", "employment": "experience", "career": "experience",
+    "role": "experience", "degree": "education", "school": "education", "university": "education",
+    "college": "education", "about": "summary", "profile": "summary", "objective": "summary",
+    "intro": "summary", "tech": "skill", "stack": "skill", "certificate": "certification",
+}
+# Query words about the resume's header: the name and contact lines before the first heading
+HEADER_WORDS = {"name", "contact", "email", "phone", "header", "address", "linkedin", "github", "headline"}
+# Words that say how to edit rather than where
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "my", "me", "i", "it", "its", "is", "be",
+    "this", "that", "these", "those", "please", "can", "could", "you", "your", "make", "more", "less", "bit",
+    "modify", "edit", "change", "update", "improve", "rewrite", "reword", "rephrase", "fix", "polish", "add",
+    "remove", "delete", "section", "part", "resume", "cv", "document", "curriculum", "vitae", "so", "sound",
+    "by", "from", "as", "at", "all", "into", "also", "some", "any", "should", "would", "using", "use",
+}
+# Send the whole document when the matching sections are most of it anyway
+MAX_SELECTED_FRACTION = 0.7
+TITLE_WEIGHT = 10.0
+
+_WORD = re.compile(r"[a-z0-9+#]+")
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, lightly stemmed words with edit verbs and filler removed"""
+    return [_stem(w) for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _query_terms(query: str) -> List[str]:
+    terms = tokenize(query)
+    return terms + [ALIASES[t] for t in terms if t in ALIASES]
+
+
+def _heading_level(paragraph, text: str, style_names: Dict[str, str]) -> Optional[int]:
+    """Outline level of a heading paragraph, or None for body text"""
+    # Resolve the style from its ID; paragraph.style searches styles.xml on every call
+    style = style_names.get(paragraph._p.style, "")
+    if style == "Title":
+        return 1
+    if style.startswith("Heading"):
+        level = style[len("Heading"):].strip()
+        return int(level) if level.isdigit() else 1
+    # Converted PDFs carry no heading styles: fall back to what section titles look like
+    text = text.strip().rstrip(":")
+    if not text or len(text) > 40 or len(text.split()) > 5 or text.endswith(".") or ":" in text:
+        return None
+    if text.lower() in KNOWN_SECTIONS:
+        return 1
+    letters = [c for c in text if c.isalpha()]
+    if any(c.isdigit() for c in text):
+        return None
+    if letters and text.isupper():
+        return 1
+    runs = [r for r in paragraph.runs if r.text.strip()]
+    if runs and all(r.bold for r in runs) and len(letters) >= 3:
+        return 1
+    return None
+
+
+def _text(element) -> str:
+    """Text of a paragraph or cell read straight from the XML, much cheaper than python-docx's .text"""
+    return " ".join("".join(t.text or "" for t in p.iter(W + "t")) for p in element.iter(W + "p"))
+
+
+def build_index(doc, sha256: str) -> dict:
+    """Split the document into sections at its top-level headings"""
+    cells: Dict[int, List[str]] = {}
+    texts = {}
+    for block_id, block in iter_blocks(doc):
+        texts[block_id] = _text(block._element)
+        match = CELL_ID.match(block_id)
+        if match:
+            cells.setdefault(int(match.group(1)), []).append(block_id)
+
+    # Walk the body in order so tables land in the section they appear in
+    paragraphs = doc.paragraphs
+    style_names = {style.style_id: style.name for style in doc.styles}
+    items, p_index, t_index = [], 0, 0
+    for child in doc.element.body.iterchildren():
+        if child.tag == W + "p":
+            block_id = f"p{p_index}"
+            text = texts[block_id]
+            items.append((block_id, _heading_level(paragraphs[p_index], text, style_names) if text.strip() else None))
+            p_index += 1
+        elif child.tag == W + "tbl":
+            items.extend((cell_id, None) for cell_id in cells.get(t_index, []))
+            t_index += 1
+
+    # Split at the highest heading level used more than once (a lone Title is usually the name)
+    levels = Counter(level for _, level in items if level is not None)
+    repeated = [level for level, count in levels.items() if count > 1]
+    split_level = min(repeated or levels or [1])
+
+    sections = [{"title": "", "block_ids": []}]
+    for block_id, level in items:
+        if level is not None and level <= split_level and sections[-1]["block_ids"]:
+            sections.append({"title": "", "block_ids": []})
+        if level is not None and level <= split_level and not sections[-1]["title"]:
+            sections[-1]["title"] = " ".join(texts[block_id].split())
+        sections[-1]["block_ids"].append(block_id)
+
+    for section in sections:
+        words = [w for block_id in section["block_ids"] for w in tokenize(texts[block_id])]
+        section["size"] = sum(1 for block_id in section["block_ids"] if texts[block_id].strip())
+        section["terms"] = dict(Counter(words))
+        section["length"] = len(words)
+    return {"version": INDEX_VERSION, "sha256": sha256, "sections": sections}
+
+
+def index_path(folder: str, doc_path: str) -> str:
+    return os.path.join(folder, os.path.basename(doc_path) + INDEX_SUFFIX)
+
+
+def save_index(folder: str, doc_path: str, index: dict):
+    path = index_path(folder, doc_path)
+    # Unique temp name: a background re-index and an on-demand build may write at the same time
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+
+
+def load_index(folder: str, doc_path: str, sha256: str) -> Optional[dict]:
+    """Return the index stored in `folder` if it describes this exact document content"""
+    try:
+        with open(index_path(folder, doc_path)) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != INDEX_VERSION or index.get("sha256") != sha256:
+        return None
+    return index
+
+
+def select_block_ids(index: dict, query: str) -> Optional[set]:
+    """Block IDs of the sections relevant to `query`, or None when the whole document should be sent"""
+    sections = index["sections"]
+    terms = _query_terms(query)
+    if len(sections) < 2 or not terms:
+        return None
+
+    document_frequency = Counter(t for section in sections for t in set(section["terms"]))
+    scores = []
+    for position, section in enumerate(sections):
+        title_terms = set(tokenize(section["title"]))
+        score = 0.0
+        for term in terms:
+            if term in title_terms or (position == 0 and term in HEADER_WORDS):
+                score += TITLE_WEIGHT
+            count = section["terms"].get(term, 0)
+            if count:
+                idf = math.log(1 + len(sections) / document_frequency[term])
+                score += count / max(1, section["length"]) * idf
+        scores.append(score)
+
+    best = max(scores)
+    if best <= 0:
+        return None
+    # Sections matched by heading win over sections that merely mention a word
+    threshold = TITLE_WEIGHT if best >= TITLE_WEIGHT else best * 0.5
+    selected = [s for s, score in zip(sections, scores) if score >= threshold]
+    total = sum(s["size"] for s in sections)
+    if sum(s["size"] for s in selected) > total * MAX_SELECTED_FRACTION:
+        return None
+    return {block_id for section in selected for block_id in section["block_ids"]}
@@ -0,0 +1,190 @@
+"""
+Pluggable per-session state (the active document) and per-document locks.
+
+`MemorySessionStore` keeps everything in the current process. `SQLiteSessionStore`
+keeps it in a database file, so several uvicorn workers on one host share sessions
+and serialize modifications of the same document through lease-based locks.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+DEFAULT_SESSION = "default"
+SESSION_COOKIE = "session_id"
+
+
+class LockTimeout(Exception):
+    """Raised when a document stays locked by another request for too long"""
+
+
+class SessionStore(ABC):
+    """Interface for session state backends"""
+
+    @abstractmethod
+    async def get_current_document(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set_current_document(self, session_id: str, filename: Optional[str]):
+        ...
+
+    @abstractmethod
+    def document_lock(self, filename: str, timeout: float = 60.0):
+        """Async context manager held while a document is being modified"""
+
+
+class MemorySessionStore(SessionStore):
+    """Single-process store: a dict of sessions and an asyncio.Lock per document"""
+
+    def __init__(self):
+        self._current: Dict[str, Optional[str]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get_current_document(self, session_id: str) -> Optional[str]:
+        return self._current.get(session_id)
+
+    async def set_current_document(self, session_id: str, filename: Optional[str]):
+        self._current[session_id] = filename
+
+    @asynccontextmanager
+    async def document_lock(self, filename: str, timeout: float = 60.0):
+        lock = self._locks.setdefault(filename, asyncio.Lock())
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise LockTimeout(f"Document '{filename}' is locked by another request")
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store backed by a SQLite file shared by every worker process on the host.
+
+    Document locks are leases: a row per locked document with an expiry, so a
+    worker that dies mid-modification cannot keep a document locked forever.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, poll_interval: float = 0.05, executor=None):
+        self.path = path
+        # A BoundedExecutor for the blocking SQLite calls; the loop's default executor when None
+        self.executor = executor
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        # Waiters in this process queue on a local lock instead of polling the database
+        self._local = MemorySessionStore()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    current_document TEXT,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS document_locks (
+                    document TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    async def _run(self, fn, *args, shed: bool = True):
+        if self.executor is not None:
+            return await self.executor.run(fn, *args, shed=shed)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def _get(self, session_id: str):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT current_document FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, session_id: str, filename: Optional[str]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, current_document, updated_at) VALUES (?, ?, ?)",
+                (session_id, filename, time.time()),
+            )
+
+    def _try_lock(self, document: str, owner: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM document_locks WHERE document = ? AND expires_at < ?", (document, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO document_locks (document, owner, expires_at) VALUES (?, ?, ?)",
+                (document, owner, now + self.lease_seconds),
+            )
+            return cursor.rowcount == 1
+
+    def _unlock(self, document: str, owner: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM document_locks WHERE document = ? AND owner = ?", (document, owner))
+
+    async def get_current_document(self, session_id: str) -> Optional[str]:
+        return await self._run(self._get, session_id)
+
+    async def set_current_document(self, session_id: str, filename: Optional[str]):
+        await self._run(self._set, session_id, filename)
+
+    @asynccontextmanager
+    async def document_lock(self, filename: str, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        async with self._local.document_lock(filename, timeout):
+            owner = uuid.uuid4().hex
+            while not await self._run(self._try_lock, filename, owner):
+                if time.monotonic() > deadline:
+                    raise LockTimeout(f"Document '{filename}' is locked by another request")
+                await asyncio.sleep(self.poll_interval)
+            try:
+                yield
+            finally:
+                # Never shed the release, or the lease would hold the document until it expires
+                await self._run(self._unlock, filename, owner, shed=False)
+
+
+def create_session_store(backend: str, data_folder: str, executor=None) -> SessionStore:
+    """Build the store named by SESSION_STORE ("sqlite" or "memory")"""
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.path.join(data_folder, "sessions.sqlite3"), executor=executor)
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+
+class SessionCookieMiddleware:
+    """ASGI middleware that sends a `session_id` cookie when the request was issued a new session.
+
+    Request handlers issue one by setting `request.state.issued_session_id`.
+    """
+
+    def __init__(self, app, max_age: int = 30 * 24 * 3600):
+        self.app = app
+        self.max_age = max_age
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            issued = scope.get("state", {}).get("issued_session_id")
+            if message["type"] == "http.response.start" and issued:
+                cookie = f"{SESSION_COOKIE}={issued}; Max-Age={self.max_age}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch upload endpoint
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from unittest import mock
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from test_conversion import create_test_pdf
+
+
+def test_batch_upload_reports_per_file_results():
+    """PDFs are converted concurrently, .docx files stored as-is and junk rejected, each reported separately"""
+    with tempfile.TemporaryDirectory() as tmp, TestClient(main.app) as client:
+        files = []
+        for i in range(3):
+            path = create_test_pdf(os.path.join(tmp, f"r{i}.pdf"), lines=(f"Resume {i}", "Skills: Python"))
+            files.append(("files", ("resume.pdf", open(path, "rb").read(), "application/pdf")))
+        docx_path = os.path.join(tmp, "cv.docx")
+        Document().save(docx_path)
+        files.append(("files", ("cv.docx", open(docx_path, "rb").read(), "application/octet-stream")))
+        files.append(("files", ("notes.txt", b"hello", "text/plain")))
+
+        body = client.post("/upload/batch", files=files).json()
+        statuses = [r["status"] for r in body["results"]]
+        assert statuses == ["done", "done", "done", "done", "rejected"], body
+        assert body["summary"] == {"done": 4, "rejected": 1}
+        saved = [r["saved_filename"] for r in body["results"][:4]]
+        assert len(set(saved)) == 4
+        assert all(os.path.exists(os.path.join(main.UPLOAD_FOLDER, name)) for name in saved)
+
+        res = client.post("/upload/batch?stream=true", files=files[:2])
+        lines = [json.loads(line) for line in res.text.strip().split("\n")]
+        assert sorted(r["index"] for r in lines) == [0, 1]
+        assert all(r["status"] == "done" and r["deduplicated"] for r in lines)
+
+
+def test_batch_upload_reports_conversion_task_errors():
+    """A conversion task that dies, even by cancellation, still yields a failed result for its file"""
+    async def cancelled(result, job, stored):
+        raise asyncio.CancelledError()
+
+    with tempfile.TemporaryDirectory() as tmp, TestClient(main.app) as client:
+        path = create_test_pdf(os.path.join(tmp, "r.pdf"))
+        files = [("files", ("resume.pdf", open(path, "rb").read(), "application/pdf")),
+                 ("files", ("notes.txt", b"hello", "text/plain"))]
+        with mock.patch.object(main, "_batch_conversion_result", cancelled):
+            body = client.post("/upload/batch", files=files).json()
+        assert [(r["filename"], r["status"]) for r in body["results"]] == [
+            ("resume.pdf", "failed"), ("notes.txt", "rejected")], body
+        assert body["results"][0]["detail"] == "CancelledError"
+
+
+if __name__ == "__main__":
+    print("Testing batch upload...")
+    with temp_stores():
+        test_batch_upload_reports_per_file_results()
+    with temp_stores():
+        test_batch_upload_reports_conversion_task_errors()
+    print("✅ Batch upload tests passed!")
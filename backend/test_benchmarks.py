@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the benchmark suite's synthetic resumes and regression check
+"""
+
+import os
+import tempfile
+
+import fitz
+from docx import Document
+
+from benchmarks.bench import compare, summarize
+from benchmarks.synthetic import make_resume_docx, make_resume_pdf
+
+
+def test_synthetic_resumes_scale_with_pages():
+    """Generated resumes are deterministic, grow with the page count and contain tables"""
+    with tempfile.TemporaryDirectory() as tmp:
+        small = Document(make_resume_docx(os.path.join(tmp, "small.docx"), pages=1))
+        large = Document(make_resume_docx(os.path.join(tmp, "large.docx"), pages=10))
+        again = Document(make_resume_docx(os.path.join(tmp, "again.docx"), pages=10))
+        assert len(large.paragraphs) > 5 * len(small.paragraphs)
+        assert large.tables
+        assert [p.text for p in large.paragraphs] == [p.text for p in again.paragraphs]
+
+        with fitz.open(make_resume_pdf(os.path.join(tmp, "resume.pdf"), pages=10)) as pdf:
+            assert pdf.page_count >= 8
+
+
+def test_compare_flags_regressions():
+    """Only metrics slower (or lower-throughput) than the tolerance allows are reported"""
+    baseline = {"results": {
+        "preview": summarize([0.010] * 20),
+        "modify": summarize([0.100] * 20),
+        "http.throughput": {"per_second": 10.0},
+    }}
+    current = {"results": {
+        "preview": summarize([0.011] * 20),
+        "modify": summarize([0.200] * 20),
+        "http.throughput": {"per_second": 5.0},
+    }}
+    regressions = compare(current, baseline, tolerance=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("modify:")
+    assert regressions[1].startswith("http.throughput:")
+
+
+if __name__ == "__main__":
+    print("Testing benchmark helpers...")
+    test_synthetic_resumes_scale_with_pages()
+    test_compare_flags_regressions()
+    print("✅ Benchmark helper tests passed!")
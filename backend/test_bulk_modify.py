@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk modification of many documents and the LLM rate limiter
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from unittest import mock
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from llm_stub import create_stub_app
+from rate_limit import RateLimiter
+from test_chat import _stub_client
+
+
+def test_rate_limiter():
+    """Calls over the token budget wait for the bucket to refill; reported usage is refunded"""
+    async def run():
+        limiter = RateLimiter(tokens_per_minute=6000)
+        start = time.monotonic()
+        await limiter.acquire(6000)
+        await limiter.acquire(50)
+        waited = time.monotonic() - start
+        limiter.settle(1000, 100)
+        return waited, limiter
+
+    waited, limiter = asyncio.run(run())
+    assert 0.4 < waited < 1.5, waited
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.tokens.level > 850
+
+    async def unlimited():
+        limiter = RateLimiter()
+        for _ in range(1000):
+            await limiter.acquire(10 ** 6)
+        return limiter.stats()
+
+    assert asyncio.run(unlimited())["acquired"] == 0
+
+
+def test_bulk_modify():
+    """Every listed document is edited once with the same prompt; failed attempts are retried"""
+    attempts = {}
+
+    def responder(messages):
+        name = re.search(r"\[p0\] (\w+)", messages[-1]["content"]).group(1)
+        attempts[name] = attempts.get(name, 0) + 1
+        # Bob's first answer is not JSON, so his edit needs a second attempt
+        if name == "Bob" and attempts[name] == 1:
+            return "Sorry, I cannot do that"
+        return json.dumps({"operations": [{"op": "replace", "id": "p1", "text": "Acme Corp, 1 Main St"}]})
+
+    stub = create_stub_app(responder=responder)
+    uploads = main.UPLOAD_FOLDER
+    with mock.patch.object(main, "BULK_RETRY_BACKOFF", 0), TestClient(main.app) as client:
+        main.llm_client = _stub_client(stub)
+        names = ["Alice", "Bob", "Carol"]
+        for name in names:
+            doc = Document()
+            doc.add_paragraph(name)
+            doc.add_paragraph("Old address")
+            doc.save(os.path.join(uploads, f"{name.lower()}.docx"))
+        filenames = [f"{name.lower()}.docx" for name in names] + ["missing.docx"]
+        prompt = "Update the company address to Acme Corp, 1 Main St"
+
+        res = client.post("/documents/bulk-modify", json={"filenames": filenames, "prompt": prompt}).json()
+        assert [r["status"] for r in res["results"]] == ["modified", "modified", "modified", "not_found"]
+        assert res["summary"] == {"modified": 3, "not_found": 1}
+        assert [r["attempts"] for r in res["results"][:3]] == [1, 2, 1]
+        assert all(r["previous_version"] == 1 for r in res["results"][:3])
+        for name in names:
+            paragraphs = [p.text for p in Document(os.path.join(uploads, f"{name.lower()}.docx")).paragraphs]
+            assert paragraphs == [name, "Acme Corp, 1 Main St"]
+
+        lines = client.post("/documents/bulk-modify?stream=true",
+                            json={"filenames": filenames[:2], "prompt": "Update my title"}).text.splitlines()
+        assert sorted(json.loads(line)["index"] for line in lines) == [0, 1]
+
+        assert client.post("/documents/bulk-modify",
+                           json={"filenames": ["a.docx", "a.docx"], "prompt": prompt}).status_code == 400
+        assert client.post("/documents/bulk-modify",
+                           json={"filenames": ["../x.docx"], "prompt": prompt}).json()["summary"] == {"not_found": 1}
+
+
+if __name__ == "__main__":
+    print("Testing bulk modification...")
+    for test in (test_rate_limiter, test_bulk_modify):
+        with temp_stores():
+            test()
+    print("✅ Bulk modification tests passed!")
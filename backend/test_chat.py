@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for the /chat endpoint against the local LLM stub
+"""
+
+import asyncio
+import json
+import os
+
+import httpx
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from llm import LLMClient
+from incremental_json import JSONArrayStream
+from llm_stub import CHAT_REPLY, create_stub_app
+from sessions import DEFAULT_SESSION
+
+
+# Tests set the current document of DEFAULT_SESSION, so their clients name it explicitly
+SESSION_HEADERS = {"X-Session-ID": DEFAULT_SESSION}
+
+
+def _set_current(filename, session_id=DEFAULT_SESSION):
+    asyncio.run(main.session_store.set_current_document(session_id, filename))
+
+
+def _stub_client(stub):
+    return LLMClient(api_key="stub", base_url="http://llm-stub", backoff=0.01,
+                     transport=httpx.ASGITransport(app=stub))
+
+
+def test_chat_retries_rate_limits():
+    """A plain question is answered through the shared client, retrying a 429 first"""
+    stub = create_stub_app(fail_first=1)
+    with TestClient(main.app) as client:
+        main.llm_client = _stub_client(stub)
+        res = client.post("/chat", json={"message": "Any tips for interviews?"}, headers={"X-Session-ID": "tips"})
+        assert res.status_code == 200, res.text
+        assert res.json() == {"response": CHAT_REPLY, "document_modified": False}
+        assert len(stub.state.requests) == 2
+        assert main.llm_client.stats()["retries"] == 1
+
+
+def test_chat_modifies_current_document():
+    """A modification request rewrites the current document and returns its new content"""
+    stub = create_stub_app(responder=lambda messages: '{"operations": [{"op": "replace", "id": "p1", "text": "Senior Engineer"}]}')
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        _set_current("resume.docx")
+        doc = Document()
+        doc.add_paragraph("Jane Doe")
+        doc.add_paragraph("Engineer")
+        doc.save(os.path.join(uploads, "resume.docx"))
+        main.llm_client = _stub_client(stub)
+
+        res = client.post("/chat", json={"message": "Update my resume title"})
+        body = res.json()
+        assert body["document_modified"] is True, body
+        assert body["updated_content"] == "Jane Doe\nSenior Engineer"
+
+
+def _events(body):
+    """Parse a server-sent event stream into (event, data) pairs"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_json_array_stream_emits_completed_items():
+    """Items are emitted as soon as they close, whatever the chunking"""
+    text = 'Sure! {"operations": ["a, \\"b\\" ]", "c"], "tables": [{"rows": [["x"]]}]}'
+    parser = JSONArrayStream("operations")
+    items = []
+    for ch in text:
+        items.extend(parser.feed(ch))
+    assert items == ['a, "b" ]', "c"]
+
+
+def test_chat_stream_tokens_and_operations():
+    """Streaming answers arrive as tokens; streamed edits emit each operation, then save"""
+    stub = create_stub_app(responder=lambda messages: (
+        CHAT_REPLY if messages[0]["content"] == main.CHAT_SYSTEM_PROMPT
+        else '{"operations": [{"op": "insert_after", "id": "p0", "text": "Staff Engineer"}]}'
+    ))
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        main.llm_client = _stub_client(stub)
+        events = _events(client.post("/chat", json={"message": "Any tips?", "stream": True}).text)
+        assert [e for e, _ in events[:-1]] == ["token"] * len(events[:-1]) and len(events) > 2
+        assert events[-1] == ("done", {"response": CHAT_REPLY, "document_modified": False})
+
+        doc = Document()
+        doc.add_paragraph("Jane Doe")
+        doc.save(os.path.join(uploads, "resume.docx"))
+        _set_current("resume.docx")
+        events = _events(client.post("/chat", json={"message": "Edit my title", "stream": True}).text)
+        assert events[0] == ("operation", {"op": "insert_after", "id": "p0", "text": "Staff Engineer"})
+        assert events[-1][0] == "done"
+        assert events[-1][1]["updated_content"] == "Jane Doe\nStaff Engineer"
+
+
+def test_chat_response_cache_and_bypass():
+    """Repeated requests replay the cached response unless the bypass header is sent"""
+    stub = create_stub_app()
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        main.llm_client = _stub_client(stub)
+        for _ in range(2):
+            assert client.post("/chat", json={"message": "Any  TIPS?"}).json()["response"] == CHAT_REPLY
+        client.post("/chat", json={"message": "any tips?"}, headers={"X-LLM-Cache": "bypass"})
+        assert len(stub.state.requests) == 2
+
+        # Modifications are keyed on document content: each edit changes the key
+        for name in ("a.docx", "b.docx"):
+            doc = Document()
+            doc.add_paragraph("jane doe")
+            doc.save(os.path.join(uploads, name))
+        for name in ("a.docx", "b.docx"):
+            _set_current(name)
+            assert client.post("/chat", json={"message": "Edit my name"}).json()["document_modified"]
+        assert len(stub.state.requests) == 3
+        assert Document(os.path.join(uploads, "b.docx")).paragraphs[0].text == "JANE DOE"
+
+        stats = client.get("/stats").json()["llm_cache"]
+        assert stats["hits"] == 2 and stats["bypasses"] == 1
+
+
+def test_sessions_are_isolated():
+    """Each X-Session-ID has its own current document; clients without one are issued a session cookie"""
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app) as client:
+        for name in ("alice", "bob"):
+            doc = Document()
+            doc.add_paragraph(f"{name} resume")
+            doc.save(os.path.join(uploads, f"{name}.docx"))
+            _set_current(f"{name}.docx", session_id=name)
+        for name in ("alice", "bob"):
+            res = client.get("/current-preview", headers={"X-Session-ID": name})
+            assert res.json()["content"] == f"{name} resume"
+        assert client.get("/current-document", headers={"X-Session-ID": "../x"}).status_code == 400
+
+        res = client.get("/current-document")
+        assert res.json() == {"current_document": None}
+        session_id = res.cookies["session_id"]
+        _set_current("alice.docx", session_id=session_id)
+        res = client.get("/current-document")
+        assert res.json() == {"current_document": "alice.docx"} and "set-cookie" not in res.headers
+        with TestClient(main.app) as other:
+            assert other.get("/current-document").json() == {"current_document": None}
+
+
+if __name__ == "__main__":
+    print("Testing chat endpoint...")
+    for test in (
+        test_chat_retries_rate_limits,
+        test_chat_modifies_current_document,
+        test_json_array_stream_emits_completed_items,
+        test_chat_stream_tokens_and_operations,
+        test_chat_response_cache_and_bypass,
+        test_sessions_are_isolated,
+    ):
+        with temp_stores():
+            test()
+    print("✅ Chat endpoint tests passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for ETags, 304 responses and byte ranges on the preview and download endpoints
+"""
+
+import os
+from unittest import mock
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from conditional import content_disposition, etag_matches, parse_range
+from test_chat import SESSION_HEADERS, _set_current
+
+
+def test_parse_range():
+    """Single ranges are clamped to the file; unsatisfiable ones raise, unsupported ones mean the whole file"""
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range(None, 100) is None
+    for header in ("bytes=100-", "bytes=5-2", "bytes=-0"):
+        try:
+            parse_range(header, 100)
+        except ValueError:
+            continue
+        raise AssertionError(header)
+    assert etag_matches('W/"a", "b"', '"b"') and etag_matches("*", '"b"') and not etag_matches('"a"', '"b"')
+    assert content_disposition("resume.docx") == 'attachment; filename="resume.docx"'
+    assert content_disposition('r"sumé.docx') == "attachment; filename*=utf-8''r%22sum%C3%A9.docx"
+
+
+def test_preview_and_download_revalidation():
+    """A matching If-None-Match gets 304 without parsing; a changed document gets a new ETag"""
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        path = os.path.join(uploads, "resume.docx")
+        doc = Document()
+        doc.add_paragraph("Jane Doe")
+        doc.save(path)
+        _set_current("resume.docx")
+
+        for url in ("/preview/resume.docx", "/current-preview"):
+            first = client.get(url)
+            etag = first.headers["etag"]
+            with mock.patch.object(main, "_preview_page", side_effect=AssertionError("parsed")):
+                res = client.get(url, headers={"If-None-Match": etag})
+            assert res.status_code == 304 and res.headers["etag"] == etag and not res.content
+            # Another page of the same document is a different representation
+            assert client.get(url + "?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+        download = client.get("/download/resume.docx")
+        data, etag = download.content, download.headers["etag"]
+        assert data == open(path, "rb").read() and download.headers["accept-ranges"] == "bytes"
+        assert client.get("/download/resume.docx", headers={"If-None-Match": etag}).status_code == 304
+
+        part = client.get("/download/resume.docx", headers={"Range": "bytes=10-19"})
+        assert part.status_code == 206 and part.content == data[10:20]
+        assert part.headers["content-range"] == f"bytes 10-19/{len(data)}"
+        assert client.get("/download/resume.docx", headers={"Range": "bytes=-5"}).content == data[-5:]
+        bad = client.get("/download/resume.docx", headers={"Range": f"bytes={len(data)}-"})
+        assert bad.status_code == 416 and bad.headers["content-range"] == f"bytes */{len(data)}"
+
+        doc.add_paragraph("Engineer")
+        doc.save(path)
+        changed = client.get("/preview/resume.docx", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and "Engineer" in changed.json()["content"]
+        # A range against an old version (If-Range) gets the whole new file
+        stale = client.get("/download/resume.docx", headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert stale.status_code == 200 and stale.content == open(path, "rb").read()
+
+        doc.save(os.path.join(uploads, "简历.docx"))
+        res = client.get("/download/简历.docx")
+        assert res.status_code == 200
+        assert res.headers["content-disposition"] == "attachment; filename*=utf-8''%E7%AE%80%E5%8E%86.docx"
+
+
+if __name__ == "__main__":
+    print("Testing conditional requests...")
+    for test in (test_parse_range, test_preview_and_download_revalidation):
+        with temp_stores():
+            test()
+    print("✅ Conditional request tests passed!")
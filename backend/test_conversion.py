@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-pool PDF -> DOCX conversion engine
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest import mock
+
+import fitz
+from docx import Document
+
+from conversion import ConversionEngine, QueueFull, DONE, FAILED, TIMEOUT, CANCELLED
+
+
+def create_test_pdf(path, lines=("Test Resume", "Name: John Doe", "Skills: Python")):
+    """Create a small single-page PDF"""
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, line in enumerate(lines):
+        page.insert_text((72, 72 + 20 * i), line)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_conversion_engine_converts_pdf():
+    """A queued job runs in a worker process and produces a readable .docx"""
+    async def run(tmp):
+        engine = ConversionEngine(workers=1, timeout=60)
+        try:
+            pdf_path = create_test_pdf(os.path.join(tmp, "resume.pdf"))
+            docx_path = os.path.join(tmp, "resume.docx")
+            job = await engine.wait(engine.submit(pdf_path, docx_path))
+            assert job.status == DONE, job.error
+            assert engine.get(job.id).to_dict()["saved_filename"] == "resume.docx"
+            text = "\n".join(p.text for p in Document(docx_path).paragraphs)
+            assert "John Doe" in text
+        finally:
+            engine.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(tmp))
+
+
+def test_conversion_engine_timeout_cancel_and_backpressure():
+    """Timed-out jobs kill their worker; queued jobs can be cancelled; a full queue rejects"""
+    async def run(tmp):
+        engine = ConversionEngine(workers=1, max_queue=1, timeout=0.01)
+        try:
+            pdf_path = create_test_pdf(os.path.join(tmp, "resume.pdf"))
+            running = engine.submit(pdf_path, os.path.join(tmp, "a.docx"))
+            await asyncio.sleep(0)
+            queued = engine.submit(pdf_path, os.path.join(tmp, "b.docx"))
+            try:
+                engine.submit(pdf_path, os.path.join(tmp, "c.docx"))
+                assert False, "expected QueueFull"
+            except QueueFull:
+                pass
+            engine.cancel(queued.id)
+            assert queued.status == CANCELLED
+            await engine.wait(running)
+            assert running.status == TIMEOUT
+            assert not os.path.exists(os.path.join(tmp, "a.docx"))
+        finally:
+            engine.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(tmp))
+
+
+def test_conversion_engine_survives_worker_errors():
+    """A job whose worker errors out fails on its own; the slot keeps serving the next job"""
+    async def run(tmp):
+        engine = ConversionEngine(workers=1, timeout=60)
+        try:
+            pdf_path = create_test_pdf(os.path.join(tmp, "resume.pdf"))
+            real_worker = engine._worker
+            calls = []
+
+            def flaky_worker(slot):
+                calls.append(slot)
+                if len(calls) == 1:
+                    raise OSError("pipe broken")
+                return real_worker(slot)
+
+            with mock.patch.object(engine, "_worker", side_effect=flaky_worker):
+                failed = await engine.wait(engine.submit(pdf_path, os.path.join(tmp, "a.docx")))
+                done = await engine.wait(engine.submit(pdf_path, os.path.join(tmp, "b.docx")))
+            assert failed.status == FAILED and "pipe broken" in failed.error
+            assert done.status == DONE, done.error
+        finally:
+            engine.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(tmp))
+
+
+if __name__ == "__main__":
+    print("Testing conversion engine...")
+    test_conversion_engine_converts_pdf()
+    test_conversion_engine_timeout_cancel_and_backpressure()
+    test_conversion_engine_survives_worker_errors()
+    print("✅ Conversion engine tests passed!")
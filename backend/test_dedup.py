@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for the upload deduplication index
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from dedup import DedupIndex
+
+
+def test_dedup_index_checkout_and_stats():
+    """An indexed conversion is handed out as an independent copy and counted as saved work"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DedupIndex(os.path.join(tmp, "dedup"))
+        converted = os.path.join(tmp, "first.docx")
+        with open(converted, "wb") as f:
+            f.write(b"converted docx bytes")
+
+        assert index.checkout("abc", os.path.join(tmp, "miss.docx")) is False
+        index.add("abc", converted, source_size=1234, conversion_seconds=2.5)
+
+        # Editing the working copy must not affect the stored conversion
+        with open(converted, "wb") as f:
+            f.write(b"edited by the user")
+        copy = os.path.join(tmp, "second.docx")
+        assert index.checkout("abc", copy) is True
+        with open(copy, "rb") as f:
+            assert f.read() == b"converted docx bytes"
+
+        stats = index.stats()
+        assert stats["entries"] == 1
+        assert stats["conversions_skipped"] == 1
+        assert stats["conversion_seconds_saved"] == 2.5
+
+
+
+def test_concurrent_adds_of_the_same_conversion():
+    """Workers indexing the same PDF at once each write their own temp file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DedupIndex(os.path.join(tmp, "dedup"))
+        converted = os.path.join(tmp, "converted.docx")
+        with open(converted, "wb") as f:
+            f.write(b"converted docx bytes" * 10_000)
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: index.add("abc", converted, source_size=1, conversion_seconds=1.0), range(16)))
+        assert os.listdir(index.blob_dir) == ["abc.docx"]
+        with open(index.lookup("abc"), "rb") as f:
+            assert f.read() == b"converted docx bytes" * 10_000
+
+
+if __name__ == "__main__":
+    print("Testing dedup index...")
+    test_dedup_index_checkout_and_stats()
+    test_concurrent_adds_of_the_same_conversion()
+    print("✅ Dedup index tests passed!")
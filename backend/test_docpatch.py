@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for block IDs and in-place patch operations
+"""
+
+from docx import Document
+
+from docpatch import apply_operations, render_blocks
+
+
+def create_styled_document():
+    doc = Document()
+    doc.add_heading("Jane Doe", 0)
+    summary = doc.add_paragraph()
+    summary.add_run("Summary: ").bold = True
+    summary.add_run("Backend engineer with a typo in teh summary.")
+    doc.add_paragraph("Skills: Python", style="List Bullet")
+    doc.add_paragraph("Obsolete line")
+    table = doc.add_table(rows=2, cols=2)
+    table.rows[0].cells[0].text = "Skill"
+    table.rows[0].cells[1].text = "Years"
+    table.rows[1].cells[0].text = "Python"
+    table.rows[1].cells[1].text = "5"
+    return doc
+
+
+def test_render_blocks_ids():
+    """Paragraphs and table cells are addressable by stable IDs"""
+    rendered = render_blocks(create_styled_document())
+    assert "[p0] Jane Doe" in rendered
+    assert "[p1] Summary: Backend engineer with a typo in teh summary." in rendered
+    assert "[t0r1c1] 5" in rendered
+
+
+def test_apply_operations_in_place():
+    """Operations edit only their blocks and keep styles and run formatting"""
+    doc = create_styled_document()
+    result = apply_operations(doc, [
+        {"op": "replace", "id": "p1", "text": "Summary: Backend engineer with a clean summary."},
+        {"op": "insert_after", "id": "p2", "text": "Skills: Go"},
+        {"op": "insert_after", "id": "p2", "text": "Skills: SQL"},
+        {"op": "delete", "id": "p3"},
+        {"op": "replace", "id": "t0r1c1", "text": "6"},
+        {"op": "replace", "id": "p99", "text": "ignored"},
+    ])
+    assert result == {"applied": 5, "skipped": 1}
+
+    paragraphs = doc.paragraphs
+    assert [p.text for p in paragraphs] == [
+        "Jane Doe",
+        "Summary: Backend engineer with a clean summary.",
+        "Skills: Python",
+        "Skills: Go",
+        "Skills: SQL",
+    ]
+    assert paragraphs[0].style.name == "Title"
+    # The unchanged bold prefix run is left alone; the edit lands in the plain run after it
+    assert [(r.text, r.bold) for r in paragraphs[1].runs] == [
+        ("Summary: ", True), ("Backend engineer with a clean summary.", None)]
+    assert paragraphs[3].style.name == "List Bullet"
+    assert doc.tables[0].rows[1].cells[1].text == "6"
+
+
+
+def test_insert_after_clones_only_formatting():
+    """Inserted paragraphs take the anchor's style and main run formatting, not its section break or bookmarks"""
+    from docx.oxml.ns import qn
+
+    doc = Document()
+    anchor = doc.add_paragraph(style="List Bullet")
+    anchor.add_run("Python").italic = True
+    anchor.add_run(" (5 years)")
+    p = anchor._p
+    bookmark = p.makeelement(qn("w:bookmarkStart"), {qn("w:id"): "0", qn("w:name"): "skills"})
+    p.insert(1, bookmark)
+    p.get_or_add_pPr().append(p.makeelement(qn("w:sectPr"), {}))
+
+    assert apply_operations(doc, [{"op": "insert_after", "id": "p0", "text": "Go"}]) == {"applied": 1, "skipped": 0}
+    inserted = doc.paragraphs[1]
+    assert inserted.text == "Go" and inserted.style.name == "List Bullet"
+    assert [(r.text, r.bold, r.italic) for r in inserted.runs] == [("Go", None, None)]
+    assert inserted._p.find(f"{qn('w:pPr')}/{qn('w:sectPr')}") is None
+    assert inserted._p.find(qn("w:bookmarkStart")) is None
+
+
+def test_replace_hyperlink_only_paragraph():
+    """A paragraph holding nothing but a hyperlink gets the new text in the link's run formatting"""
+    from docx.oxml.ns import qn
+
+    doc = Document()
+    p = doc.add_paragraph()._p
+    link = p.makeelement(qn("w:hyperlink"), {qn("r:id"): "rId99"})
+    run = doc.add_paragraph().add_run("linkedin.com/in/jane")
+    run.italic = True
+    link.append(run._r)
+    p.append(link)
+
+    assert apply_operations(doc, [{"op": "replace", "id": "p0", "text": "jane@example.com"}]) == {
+        "applied": 1, "skipped": 0}
+    paragraph = doc.paragraphs[0]
+    assert paragraph.text == "jane@example.com"
+    assert [(r.text, r.italic) for r in paragraph.runs] == [("jane@example.com", True)]
+    assert paragraph._p.find(qn("w:hyperlink")) is None
+
+
+if __name__ == "__main__":
+    print("Testing document patch operations...")
+    test_render_blocks_ids()
+    test_apply_operations_in_place()
+    test_insert_after_clones_only_formatting()
+    test_replace_hyperlink_only_paragraph()
+    print("✅ Document patch tests passed!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded executors and 503 shedding
+"""
+
+import asyncio
+import os
+import threading
+from unittest import mock
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+import metrics
+from executors import BoundedExecutor, ExecutorSaturated
+
+
+def _occupy(executor, release):
+    """Hold one of the executor's slots from another thread until `release` is set"""
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(10)
+
+    thread = threading.Thread(target=asyncio.run, args=(executor.run(block),))
+    thread.start()
+    started.wait(10)
+    return thread
+
+
+def test_shedding_and_context():
+    """Calls beyond workers + max_queue are rejected unless shed=False; context variables reach the thread"""
+    executor = BoundedExecutor("test", workers=1, max_queue=0)
+    release = threading.Event()
+    thread = _occupy(executor, release)
+    try:
+        assert executor.depth() == {"queued": 0, "running": 1}
+
+        async def calls():
+            try:
+                await executor.run(len, "abc")
+            except ExecutorSaturated:
+                pass
+            else:
+                raise AssertionError("not shed")
+            # Queued behind the blocked call, then run once it is released
+            waiting = asyncio.ensure_future(executor.run(len, "abc", shed=False))
+            await asyncio.sleep(0.05)
+            assert executor.depth() == {"queued": 1, "running": 1}
+            release.set()
+            return await waiting
+
+        assert asyncio.run(calls()) == 3
+    finally:
+        release.set()
+        thread.join()
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 2 and stats["queued"] == stats["running"] == 0
+
+    async def cancelled():
+        # Calls cancelled while queued release their slots; shed=False calls never count against the limit
+        executor = BoundedExecutor("cancel", workers=1, max_queue=2)
+        release = threading.Event()
+        blocker = asyncio.ensure_future(executor.run(release.wait, 10, shed=False))
+        await asyncio.sleep(0.05)
+        queued = [asyncio.ensure_future(executor.run(len, "abc")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        release.set()
+        await blocker
+        assert executor.depth() == {"queued": 0, "running": 0}
+        return await asyncio.gather(*(executor.run(len, "abc") for _ in range(3)))
+
+    assert asyncio.run(cancelled()) == [3, 3, 3]
+
+    async def staged():
+        token = metrics.begin_request()
+        await executor.run(metrics.record_stage, "parse", 0.25)
+        return metrics.end_request(token)
+
+    assert asyncio.run(staged()) == {"parse": 0.25}
+
+
+def test_saturated_executor_answers_503():
+    """A saturated parse executor sheds previews with 503 while the io executor keeps serving downloads"""
+    release = threading.Event()
+    parse = BoundedExecutor("parse", workers=1, max_queue=0)
+    with mock.patch.object(main, "parse_executor", parse), TestClient(main.app) as client:
+        try:
+            doc = Document()
+            doc.add_paragraph("Jane Doe")
+            doc.save(os.path.join(main.UPLOAD_FOLDER, "resume.docx"))
+            thread = _occupy(parse, release)
+
+            res = client.get("/preview/resume.docx")
+            assert res.status_code == 503 and res.headers["retry-after"] == "1", res.text
+            assert client.get("/download/resume.docx").status_code == 200
+
+            release.set()
+            thread.join()
+            assert client.get("/preview/resume.docx").status_code == 200
+            assert "resume_executor_rejected_total" in client.get("/metrics").text
+            assert set(client.get("/stats").json()["executors"]) == {"parse", "io", "llm", "background"}
+        finally:
+            release.set()
+
+
+if __name__ == "__main__":
+    print("Testing executors...")
+    for test in (test_shedding_and_context, test_saturated_executor_answers_503):
+        with temp_stores():
+            test()
+    print("✅ Executor tests passed!")
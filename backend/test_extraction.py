@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the preview extraction cache
+"""
+
+import os
+import tempfile
+import fitz
+from docx import Document
+
+from extraction import ExtractionCache, read_text_window
+
+
+def _write_docx(path, lines):
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    doc.save(path)
+
+
+def test_extraction_cache_hits_and_invalidation():
+    """Repeated reads hit the cache; invalidate() forces a re-parse"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.docx")
+        _write_docx(path, ["Jane Doe", "Python developer"])
+        cache = ExtractionCache()
+
+        first = cache.get(path)
+        second = cache.get(path)
+        assert first is second
+        assert first.paragraphs == ["Jane Doe", "Python developer"]
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+        _write_docx(path, ["Jane Doe", "Senior Python developer"])
+        cache.invalidate(path)
+        assert cache.get(path).paragraphs[1] == "Senior Python developer"
+        assert cache.stats()["misses"] == 2
+
+
+def test_extraction_cache_evicts_by_bytes():
+    """The least recently used entry is evicted once the byte budget is exceeded"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(3):
+            path = os.path.join(tmp, f"resume{i}.docx")
+            _write_docx(path, [f"Resume {i} " + "x" * 2000])
+            paths.append(path)
+        cache = ExtractionCache(max_bytes=9000)
+        for path in paths:
+            cache.get(path)
+        stats = cache.stats()
+        assert stats["evictions"] >= 1
+        assert stats["bytes"] <= 9000
+
+
+def _read_all(path, limit):
+    pages, cursor = [], None
+    while True:
+        window = read_text_window(path, cursor, limit)
+        pages.append(window.content)
+        cursor = window.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_text_window_pages_through_docx():
+    """Windows follow document order (tables inline) and concatenate to the full text"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.docx")
+        doc = Document()
+        doc.add_paragraph("Jane Doe")
+        doc.add_paragraph("")
+        table = doc.add_table(rows=1, cols=2)
+        table.rows[0].cells[0].text = "Python"
+        table.rows[0].cells[1].text = "5 years"
+        doc.add_paragraph("Experience\twith tabs")
+        doc.save(path)
+
+        full = read_text_window(path, None, 10000)
+        assert full.content == "Jane Doe\nPython | 5 years\nExperience\twith tabs"
+        assert full.next_cursor is None
+        pages = _read_all(path, 7)
+        assert "".join(pages) == full.content
+        assert all(len(page) == 7 for page in pages[:-1])
+
+
+def test_text_window_resumes_pdf_at_page():
+    """A PDF cursor points at a page, so later windows start there directly"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.pdf")
+        pdf = fitz.open()
+        for i in range(5):
+            pdf.new_page().insert_text((72, 72), f"Page {i}")
+        pdf.save(path)
+        pdf.close()
+
+        first = read_text_window(path, None, 7)
+        assert first.content == "Page 0\n" and first.next_cursor == "1.0"
+        assert read_text_window(path, "3.5", 2).content == "3\n"
+        assert "".join(_read_all(path, 4)) == "".join(f"Page {i}\n" for i in range(5))
+
+
+if __name__ == "__main__":
+    print("Testing extraction cache...")
+    test_extraction_cache_hits_and_invalidation()
+    test_extraction_cache_evicts_by_bytes()
+    test_text_window_pages_through_docx()
+    test_text_window_resumes_pdf_at_page()
+    print("✅ Extraction cache tests passed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for /metrics and the slow-request log
+"""
+
+import asyncio
+import logging
+import os
+
+from docx import Document
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+import metrics
+from llm_stub import create_stub_app
+from test_chat import SESSION_HEADERS, _set_current, _stub_client
+
+
+def test_histogram_text_format():
+    """Histograms render cumulative buckets, a sum and a count per label set"""
+    registry = metrics.Registry()
+    latency = registry.histogram("demo_seconds", "Demo latency", ["kind"], buckets=(0.1, 1.0))
+    latency.observe(0.05, kind="a")
+    latency.observe(0.5, kind="a")
+    latency.observe(5, kind="a")
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{kind="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{kind="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{kind="a"} 5.55' in text
+    assert 'demo_seconds_count{kind="a"} 3' in text
+
+
+def test_registration_is_idempotent():
+    """Registering a metric twice (e.g. a module executed again) returns the first one"""
+    registry = metrics.Registry()
+    requests = registry.counter("demo_total", "Demo requests", ["kind"])
+    assert registry.counter("demo_total", "Demo requests", ["kind"]) is requests
+    try:
+        registry.gauge("demo_total", "Demo requests", lambda: [])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a metric of another type was registered under the same name")
+
+def test_metrics_cover_modification_stages():
+    """A /chat modification shows up in the LLM, token, parse and docx histograms"""
+    stub = create_stub_app(responder=lambda messages: '{"operations": [{"op": "replace", "id": "p0", "text": "Jo"}]}')
+    saves = metrics.docx_save_seconds.count()
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        _set_current("resume.docx")
+        doc = Document()
+        doc.add_paragraph("Jane Doe")
+        doc.save(os.path.join(uploads, "resume.docx"))
+        main.llm_client = _stub_client(stub)
+
+        assert client.post("/chat", json={"message": "Edit my name"}).json()["document_modified"]
+        res = client.get("/metrics")
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/plain")
+        text = res.text
+        assert 'resume_llm_request_seconds_count{mode="complete",outcome="ok"}' in text
+        assert 'resume_llm_tokens_count{type="completion"}' in text
+        assert 'resume_docx_load_seconds_count{purpose="patch"}' in text
+        assert "resume_llm_response_parse_seconds_count" in text
+        assert 'resume_http_request_seconds_count{method="POST",handler="chat_endpoint",status="200"}' in text
+        assert 'resume_executor_queue_depth{executor="conversion",state="queued"} 0' in text
+        assert metrics.docx_save_seconds.count() == saves + 1
+
+
+def test_slow_request_log_has_stage_breakdown():
+    """Requests over the threshold are logged with the time spent in each stage"""
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        with metrics.timed(metrics.docx_save_seconds, "docx_save"):
+            await asyncio.sleep(0.02)
+        # Stages recorded in worker threads count towards the same request
+        await asyncio.to_thread(metrics.record_stage, "llm", 0.5)
+        return {}
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("test_metrics.slow")
+    logger.addHandler(handler)
+    app.add_middleware(metrics.RequestMetricsMiddleware, slow_seconds=0.01, logger=logger)
+    before = metrics.slow_requests.value(handler="slow")
+    with TestClient(app) as client:
+        assert client.get("/slow").status_code == 200
+    assert metrics.slow_requests.value(handler="slow") == before + 1
+    message = records[0].getMessage()
+    assert message.startswith("Slow request GET /slow -> 200")
+    assert message.index("llm=0.500s") < message.index("docx_save=")
+
+
+
+def test_background_tasks_do_not_report_into_the_request():
+    """Spawned work starts in a fresh context unless it is part of the request"""
+    async def record(stage):
+        metrics.record_stage(stage, 1.0)
+
+    async def request():
+        token = metrics.begin_request()
+        await main._spawn(record("background"))
+        await main._spawn(record("inline"), inherit_context=True)
+        return metrics.end_request(token)
+
+    assert asyncio.run(request()) == {"inline": 1.0}
+
+
+if __name__ == "__main__":
+    print("Testing metrics...")
+    for test in (
+        test_histogram_text_format,
+        test_registration_is_idempotent,
+        test_metrics_cover_modification_stages,
+        test_slow_request_log_has_stage_breakdown,
+        test_background_tasks_do_not_report_into_the_request,
+    ):
+        with temp_stores():
+            test()
+    print("✅ Metrics tests passed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for background pre-rendering of HTML previews and page thumbnails
+"""
+
+import json
+import os
+import time
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from llm_stub import create_stub_app
+from docpatch import iter_blocks
+from prerender import render_html
+from test_chat import _stub_client
+
+
+def create_resume():
+    doc = Document()
+    doc.add_heading("Jane Doe", level=0)
+    doc.add_heading("Experience", level=1)
+    doc.add_paragraph().add_run("Built <fast> APIs").bold = True
+    table = doc.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Python"
+    table.rows[0].cells[1].text = "Expert"
+    return doc
+
+
+def _wait_ready(client, filename):
+    deadline = time.monotonic() + 30
+    while True:
+        rendering = client.get(f"/documents/{filename}/rendering").json()
+        if rendering["status"] != "pending" or time.monotonic() > deadline:
+            return rendering
+        time.sleep(0.05)
+
+
+def test_render_html():
+    """Headings, bold runs and table cells are rendered with their block IDs, text escaped"""
+    body = render_html(create_resume())
+    assert '<h1 id="p0">Jane Doe</h1>' in body
+    assert '<h2 id="p1">Experience</h2>' in body
+    assert '<p id="p2"><b>Built &lt;fast&gt; APIs</b></p>' in body
+    assert '<td id="t0r0c0">Python</td><td id="t0r0c1">Expert</td>' in body
+
+
+def test_render_html_merged_cell_ids():
+    """Merged cells carry the same IDs the patch protocol gives them"""
+    doc = Document()
+    table = doc.add_table(rows=2, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = "Skills"
+    table.cell(0, 2).text = "Years"
+    table.cell(1, 0).merge(table.cell(1, 1))
+    table.cell(0, 2).merge(table.cell(1, 2))
+    body = render_html(doc)
+    assert '<td id="t0r0c0">Skills</td><td id="t0r0c2">Years</td>' in body
+    rendered = {part.split('"')[0] for part in body.split('<td id="')[1:]}
+    assert rendered == {block_id for block_id, _ in iter_blocks(doc) if block_id.startswith("t")}
+
+
+def test_upload_and_modify_render_in_background():
+    """Uploads report a pending rendering that becomes static files; an edit renders the new content"""
+    stub = create_stub_app(responder=lambda messages: json.dumps({"operations": [
+        {"op": "replace", "id": "p0", "text": "Janet Doe"},
+    ]}))
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app) as client:
+        main.llm_client = _stub_client(stub)
+        source = os.path.join(uploads, "source.docx")
+        create_resume().save(source)
+
+        with open(source, "rb") as f:
+            res = client.post("/upload", files={"file": ("resume.docx", f)}).json()
+        filename = res["saved_filename"]
+        assert res["rendering"] == {"status": "pending", "url": f"/documents/{filename}/rendering"}
+
+        rendering = _wait_ready(client, filename)
+        assert rendering["status"] == "ready", rendering
+        assert rendering["pages"] == 1 and rendering["thumbnails"] == [f"/previews/{rendering['sha256']}/page-1.png"]
+        folder = os.path.join(main.prerenderer.folder, rendering["sha256"])
+        with open(os.path.join(folder, "page-1.png"), "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+        with open(os.path.join(folder, "index.html"), encoding="utf-8") as f:
+            assert "Jane Doe" in f.read()
+
+        assert client.post("/chat", json={"message": "Update my name"}).json()["document_modified"] is True
+        updated = _wait_ready(client, filename)
+        assert updated["status"] == "ready" and updated["sha256"] != rendering["sha256"]
+        with open(os.path.join(main.prerenderer.folder, updated["sha256"], "index.html"), encoding="utf-8") as f:
+            assert "Janet Doe" in f.read()
+        assert main.prerenderer.stats()["rendered"] == 2
+
+
+if __name__ == "__main__":
+    print("Testing pre-rendering...")
+    for test in (test_render_html, test_render_html_merged_cell_ids, test_upload_and_modify_render_in_background):
+        with temp_stores():
+            test()
+    print("✅ Pre-rendering tests passed!")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the section index and section-scoped modification prompts
+"""
+
+import json
+import os
+import time
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from llm_stub import create_stub_app
+from section_index import build_index, index_path, load_index, select_block_ids
+from test_chat import SESSION_HEADERS, _set_current, _stub_client
+
+
+def create_sectioned_resume():
+    doc = Document()
+    doc.add_paragraph("Jane Doe")
+    doc.add_paragraph("jane@example.com")
+    doc.add_paragraph("SUMMARY")
+    doc.add_paragraph("Backend engineer who likes clean APIs.")
+    doc.add_paragraph("EXPERIENCE")
+    for i in range(6):
+        doc.add_paragraph(f"Built service {i} with Python and PostgreSQL.")
+    doc.add_paragraph("SKILLS")
+    table = doc.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Kubernetes"
+    table.rows[0].cells[1].text = "Expert"
+    doc.add_paragraph("EDUCATION")
+    doc.add_paragraph("B.Sc. Computer Science")
+    return doc
+
+
+def test_sections_and_lookup():
+    """Headings split the document, tables stay in their section, and queries pick matching sections"""
+    index = build_index(create_sectioned_resume(), "sha")
+    assert [s["title"] for s in index["sections"]] == ["", "SUMMARY", "EXPERIENCE", "SKILLS", "EDUCATION"]
+    assert index["sections"][3]["block_ids"] == ["p11", "t0r0c0", "t0r0c1"]
+
+    assert select_block_ids(index, "Reword my skills section") == {"p11", "t0r0c0", "t0r0c1"}
+    assert select_block_ids(index, "Improve my degree") == {"p12", "p13"}
+    assert select_block_ids(index, "Change my name") == {"p0", "p1"}
+    # Body terms are matched too when no heading fits
+    assert select_block_ids(index, "Say I know kubernetes really well") == {"p11", "t0r0c0", "t0r0c1"}
+    # Nothing specific, or a lookup that would cover most of the document: send everything
+    assert select_block_ids(index, "Make it more professional") is None
+
+
+def test_modification_sends_only_matching_sections():
+    """The prompt holds only the requested section, and the edit lands in the full document"""
+    stub = create_stub_app(responder=lambda messages: json.dumps({"operations": [
+        {"op": "replace", "id": "p13", "text": "M.Sc. Computer Science"},
+        {"op": "replace", "id": "p3", "text": "Outside the shown sections"},
+    ]}))
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        main.llm_client = _stub_client(stub)
+        with open(os.path.join(uploads, "resume.docx"), "wb") as f:
+            create_sectioned_resume().save(f)
+        _set_current("resume.docx")
+
+        res = client.post("/chat", json={"message": "Update my education section"})
+        assert res.json()["document_modified"] is True, res.json()
+        prompt = stub.state.requests[0]["messages"][-1]["content"]
+        assert "[p13] B.Sc. Computer Science" in prompt
+        assert "[p3]" not in prompt and "Python" not in prompt
+
+        paragraphs = [p.text for p in Document(os.path.join(uploads, "resume.docx")).paragraphs]
+        assert paragraphs[13] == "M.Sc. Computer Science"
+        assert paragraphs[3] == "Backend engineer who likes clean APIs."
+        # The index is rebuilt for the new content in the background
+        doc_path = os.path.join(uploads, "resume.docx")
+        deadline = time.monotonic() + 10
+        while load_index(main.SECTION_INDEX_FOLDER, doc_path, main.extraction_cache.content_hash(doc_path)) is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        # Stored privately, not next to the publicly served document
+        assert os.path.exists(index_path(main.SECTION_INDEX_FOLDER, doc_path))
+        assert not any(name.endswith(".sections.json") for name in os.listdir(uploads))
+
+        # A response whose operations all fall outside the shown sections leaves the document alone
+        before = open(doc_path, "rb").read()
+        response = json.dumps({"operations": [{"op": "replace", "id": "p3", "text": "Outside"}]})
+        assert main._apply_modification_response(doc_path, response, {"p13"}) is False
+        assert main._apply_modification_response(doc_path, '{"operations": []}') is False
+        assert open(doc_path, "rb").read() == before
+
+
+if __name__ == "__main__":
+    print("Testing section index...")
+    for test in (test_sections_and_lookup, test_modification_sends_only_matching_sections):
+        with temp_stores():
+            test()
+    print("✅ Section index tests passed!")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the session stores and document locks
+"""
+
+import asyncio
+import os
+import tempfile
+
+from sessions import LockTimeout, SQLiteSessionStore
+
+
+def test_sqlite_store_shared_between_instances():
+    """Two stores on one file (like two worker processes) share sessions and locks"""
+    async def run(path):
+        worker_a = SQLiteSessionStore(path, poll_interval=0.01)
+        worker_b = SQLiteSessionStore(path, poll_interval=0.01)
+
+        await worker_a.set_current_document("alice", "alice.docx")
+        assert await worker_b.get_current_document("alice") == "alice.docx"
+        assert await worker_b.get_current_document("bob") is None
+
+        async with worker_a.document_lock("alice.docx"):
+            try:
+                async with worker_b.document_lock("alice.docx", timeout=0.1):
+                    assert False, "lock should be held by worker_a"
+            except LockTimeout:
+                pass
+        async with worker_b.document_lock("alice.docx", timeout=0.1):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(os.path.join(tmp, "sessions.sqlite3")))
+
+
+def test_sqlite_lock_lease_expires():
+    """A lock left behind by a dead worker is reclaimed once its lease expires"""
+    async def run(path):
+        store = SQLiteSessionStore(path, lease_seconds=0.05, poll_interval=0.01)
+        assert store._try_lock("resume.docx", "dead-worker")
+        async with store.document_lock("resume.docx", timeout=1):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(os.path.join(tmp, "sessions.sqlite3")))
+
+
+if __name__ == "__main__":
+    print("Testing session stores...")
+    test_sqlite_store_shared_between_instances()
+    test_sqlite_lock_lease_expires()
+    print("✅ Session store tests passed!")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for lazy engine imports, the import-time budget and /ready
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+
+# Measured `import main` self+children time is ~0.45 s, almost all of it FastAPI/pydantic;
+# the budget leaves room for slower machines but fails if a heavy engine is imported eagerly again
+IMPORT_TIME_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ["fitz", "docx", "groq", "httpx", "pdf2docx", "cv2", "numpy"]
+
+
+def _import_times():
+    """{module: cumulative seconds} for a fresh `import main`, from python -X importtime"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "UPLOAD_FOLDER": os.path.join(tmp, "uploads"), "DATA_FOLDER": os.path.join(tmp, "data")}
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                                check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$", line)
+        if match:
+            times[match.group(3)] = int(match.group(1)) / 1e6
+    return times
+
+
+def test_import_is_lazy_and_within_budget():
+    """Importing the app loads no heavy engine and stays within the import-time budget"""
+    times = _import_times()
+    assert not [m for m in HEAVY_MODULES if m in times], [m for m in HEAVY_MODULES if m in times]
+    assert times["main"] < IMPORT_TIME_BUDGET_SECONDS, times["main"]
+
+
+def test_ready_after_warm_up():
+    """/ready answers 503 until the warm-up has loaded every engine, then 200"""
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + 60
+        while True:
+            res = client.get("/ready")
+            if res.status_code == 200 or time.monotonic() > deadline:
+                break
+            assert res.status_code == 503
+            time.sleep(0.1)
+        assert res.status_code == 200, res.json()
+        body = res.json()
+        assert body["ready"] is True
+        assert {"docx", "pdf", "llm", "conversion"} <= set(body["engines"])
+        assert all(engine["warm"] for engine in body["engines"].values())
+
+
+if __name__ == "__main__":
+    print("Testing startup...")
+    test_import_is_lazy_and_within_budget()
+    test_ready_after_warm_up()
+    print("✅ Startup tests passed!")
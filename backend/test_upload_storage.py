@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming upload storage
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+
+from upload_storage import RequestSizeLimitMiddleware, UploadRejected, save_upload
+
+
+def _upload(filename, data):
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def test_save_upload_streams_and_hashes():
+    """Chunks are written to the final path and hashed incrementally"""
+    data = b"%PDF-1.4\n" + os.urandom(50_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = os.path.join(tmp, "resume.pdf")
+        stored = asyncio.run(save_upload(_upload("resume.pdf", data), dest, max_bytes=100_000, chunk_size=4096))
+        assert stored.size == len(data)
+        assert stored.sha256 == hashlib.sha256(data).hexdigest()
+        with open(dest, "rb") as f:
+            assert f.read() == data
+        assert os.listdir(tmp) == ["resume.pdf"]
+
+
+def test_save_upload_rejects_without_leftovers():
+    """Wrong magic bytes and oversize uploads are rejected and leave no files behind"""
+    cases = [
+        ("resume.pdf", b"not a pdf at all", 400),
+        ("resume.docx", b"%PDF-1.4 pretending to be docx", 400),
+        ("resume.pdf", b"%PDF-1.4\n" + b"x" * 10_000, 413),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for filename, data, status in cases:
+            dest = os.path.join(tmp, filename)
+            try:
+                asyncio.run(save_upload(_upload(filename, data), dest, max_bytes=5_000, chunk_size=1024))
+                assert False, "expected UploadRejected"
+            except UploadRejected as e:
+                assert e.status_code == status
+            assert os.listdir(tmp) == []
+
+
+def test_concurrent_same_name_uploads_get_distinct_names():
+    """Name reservation is atomic, and a rejected upload releases its names"""
+    uploads = main.UPLOAD_FOLDER
+    with ThreadPoolExecutor(8) as pool:
+        names = list(pool.map(lambda _: main._new_saved_filename("resume.pdf"), range(16)))
+    assert len(set(names)) == 16
+    assert len(os.listdir(uploads)) == 32  # each PDF also holds its .docx name
+    for name in names:
+        main._release_saved_filename(name)
+    assert os.listdir(uploads) == []
+
+    with TestClient(main.app) as client:
+        res = client.post("/upload", files={"file": ("resume.pdf", b"not a pdf at all")})
+    assert res.status_code == 400
+    assert os.listdir(uploads) == []
+
+
+def test_request_size_limit_before_spooling():
+    """Oversized bodies get 413 from the Content-Length or once a chunked body passes the limit"""
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, limits={"/upload": 1000, "/raw": 1000})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/raw")
+    async def raw(request: Request):
+        return {"size": len(await request.body())}
+
+    with TestClient(app) as client:
+        assert client.post("/upload", files={"file": ("a.pdf", b"x" * 100)}).json() == {"size": 100}
+        assert client.post("/upload", files={"file": ("a.pdf", b"x" * 5000)}).status_code == 413
+        chunks = (b"x" * 400 for _ in range(5))
+        assert client.post("/raw", content=chunks).status_code == 413
+        assert client.post("/raw", content=(b"x" * 400 for _ in range(2))).json() == {"size": 800}
+
+
+def test_oversized_upload_rejection_has_cors_headers():
+    """The app's 413 passes through CORS, so the frontend can read it"""
+    with TestClient(main.app) as client:
+        res = client.post("/upload", content=b"x" * (main.MAX_UPLOAD_BYTES + main.MULTIPART_OVERHEAD + 1),
+                          headers={"Origin": "http://localhost:3000"})
+        assert res.status_code == 413
+        assert res.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+def test_failed_conversion_leaves_nothing_behind():
+    """A PDF whose conversion fails is removed along with its reserved .docx name"""
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app) as client:
+        res = client.post("/upload", files={"file": ("broken.pdf", b"%PDF-1.4 but nothing else")})
+        assert res.status_code == 500, res.text
+        assert os.listdir(uploads) == []
+
+
+if __name__ == "__main__":
+    print("Testing upload storage...")
+    for test in (
+        test_save_upload_streams_and_hashes,
+        test_save_upload_rejects_without_leftovers,
+        test_concurrent_same_name_uploads_get_distinct_names,
+        test_request_size_limit_before_spooling,
+        test_oversized_upload_rejection_has_cors_headers,
+        test_failed_conversion_leaves_nothing_behind,
+    ):
+        with temp_stores():
+            test()
+    print("✅ Upload storage tests passed!")
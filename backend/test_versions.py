@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for document version history: snapshots, diff, rollback and garbage collection
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from unittest import mock
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+import main
+from conftest import temp_stores
+from llm_stub import create_stub_app
+from test_chat import SESSION_HEADERS, _set_current, _stub_client
+from versions import VersionStore
+
+
+def _save(path, *paragraphs):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+
+def test_snapshots_share_unchanged_parts():
+    """Only changed zip members add blobs, and an unchanged file adds no version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VersionStore(os.path.join(tmp, "versions"))
+        path = os.path.join(tmp, "resume.docx")
+        _save(path, "Jane Doe", "Python developer")
+        assert store.snapshot("resume.docx", path) == 1
+        assert store.snapshot("resume.docx", path) == 1
+        blobs = store.stats()["blobs"]
+
+        doc = Document(path)
+        doc.paragraphs[1].text = "Senior Python developer"
+        doc.save(path)
+        assert store.snapshot("resume.docx", path) == 2
+        stats = store.stats()
+        assert stats["versions"] == 2
+        # python-docx rewrites docProps/core.xml on save too; everything else is shared
+        assert stats["blobs"] - blobs <= 2, stats
+        assert stats["bytes_stored"] < stats["snapshot_bytes"]
+
+        diff = store.diff("resume.docx", 1, against=2)
+        assert "word/document.xml" in diff["changed_parts"]
+        assert "-Python developer" in diff["diff"] and "+Senior Python developer" in diff["diff"]
+
+        restored = os.path.join(tmp, "restored.docx")
+        store.restore("resume.docx", 1, restored)
+        assert [p.text for p in Document(restored).paragraphs] == ["Jane Doe", "Python developer"]
+
+
+def test_garbage_collection_keeps_latest():
+    """Over the quota, the least recently used versions go first and each document keeps its newest"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.docx")
+        _save(path, "v1")
+        store = VersionStore(os.path.join(tmp, "versions"), max_bytes=10 ** 9)
+        store.snapshot("resume.docx", path)
+        base = store.stats()["bytes_stored"]
+        store.max_bytes = base + 2000
+        for i in range(2, 12):
+            _save(path, f"v{i} " + "x" * 3000 + str(i) * 3000)
+            store.snapshot("resume.docx", path)
+        stats = store.stats()
+        assert stats["bytes_stored"] <= store.max_bytes or stats["versions"] == 1, stats
+        assert stats["evicted_versions"] > 0
+        versions = [v["version"] for v in store.list("resume.docx")]
+        assert versions[0] == 11
+        assert len(os.listdir(store.blob_dir)) == stats["blobs"]
+
+
+def test_snapshot_is_not_interleaved_with_garbage_collection():
+    """A collection that starts mid-snapshot waits, so the new version never points at a deleted blob"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VersionStore(os.path.join(tmp, "versions"), max_bytes=10 ** 9)
+        path = os.path.join(tmp, "resume.docx")
+        _save(path, "Jane Doe", "Python developer")
+        store.snapshot("a.docx", path)
+        copy = os.path.join(tmp, "copy.docx")
+        shutil.copyfile(path, copy)
+        _save(path, "Jane Doe", "Senior Python developer")
+        store.snapshot("a.docx", path)
+        # a.docx v1 is now evictable, and copy.docx reuses exactly its blobs
+        store.max_bytes = 1
+
+        put_blob = store._put_blob
+        collector = threading.Thread(target=store.collect_garbage)
+        with zipfile.ZipFile(copy) as zf:
+            remaining = [len(zf.infolist())]
+
+        def put_blob_then_collect(conn, data):
+            # Once every blob has been found already stored, collect before the version is inserted
+            sha256 = put_blob(conn, data)
+            remaining[0] -= 1
+            if not remaining[0]:
+                collector.start()
+                collector.join(timeout=0.5)
+            return sha256
+
+        with mock.patch.object(store, "_put_blob", side_effect=put_blob_then_collect):
+            store.snapshot("copy.docx", copy)
+        collector.join()
+        restored = os.path.join(tmp, "restored.docx")
+        store.restore("copy.docx", 1, restored)
+        assert [p.text for p in Document(restored).paragraphs] == ["Jane Doe", "Python developer"]
+
+
+def test_modify_then_rollback():
+    """A chat edit records the previous content, which the rollback endpoint restores"""
+    stub = create_stub_app(responder=lambda messages: json.dumps({"operations": [
+        {"op": "replace", "id": "p1", "text": "Staff engineer"},
+    ]}))
+    uploads = main.UPLOAD_FOLDER
+    with TestClient(main.app, headers=SESSION_HEADERS) as client:
+        main.llm_client = _stub_client(stub)
+        doc_path = os.path.join(uploads, "resume.docx")
+        _save(doc_path, "Jane Doe", "Junior engineer")
+        _set_current("resume.docx")
+
+        assert client.post("/chat", json={"message": "Update my job title"}).json()["document_modified"] is True
+        versions = client.get("/documents/resume.docx/versions").json()["versions"]
+        assert [(v["version"], v["reason"]) for v in versions] == [(1, "modify")]
+
+        diff = client.get("/documents/resume.docx/versions/1/diff").json()
+        assert "-Junior engineer" in diff["diff"] and "+Staff engineer" in diff["diff"]
+
+        res = client.post("/documents/resume.docx/versions/1/rollback")
+        assert res.json() == {"filename": "resume.docx", "restored": 1, "previous": 2}
+        assert [p.text for p in Document(doc_path).paragraphs] == ["Jane Doe", "Junior engineer"]
+        assert "Junior engineer" in client.get("/preview/resume.docx").json()["content"]
+
+        assert client.post("/documents/resume.docx/versions/9/rollback").status_code == 404
+        assert client.get("/documents/missing.docx/versions").status_code == 404
+        assert client.get("/stats").json()["versions"]["versions"] == 2
+
+
+if __name__ == "__main__":
+    print("Testing version history...")
+    for test in (
+        test_snapshots_share_unchanged_parts,
+        test_garbage_collection_keeps_latest,
+        test_snapshot_is_not_interleaved_with_garbage_collection,
+        test_modify_then_rollback,
+    ):
+        with temp_stores():
+            test()
+    print("✅ Version history tests passed!")
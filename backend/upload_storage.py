@@ -0,0 +1,153 @@
+"""
+Streaming, size-bounded upload storage with validation before anything is written
+"""
+
+import asyncio
+import functools
+import hashlib
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+ALLOWED_EXTENSIONS = {".pdf", ".docx"}
+CHUNK_SIZE = 1024 * 1024
+# Room for the multipart boundaries and part headers around a single file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Leading bytes every valid file of each type starts with
+MAGIC_BYTES = {
+    ".pdf": b"%PDF-",
+    ".docx": b"PK\x03\x04",
+}
+
+
+class UploadRejected(Exception):
+    """Raised when an upload fails validation; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+def check_extension(filename: str) -> str:
+    """Return the lower-cased extension, rejecting anything but .pdf/.docx"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise UploadRejected(400, "Only .pdf or .docx files are allowed")
+    return ext
+
+
+def check_magic(ext: str, head: bytes):
+    """Reject files whose leading bytes don't match their extension"""
+    if not head.startswith(MAGIC_BYTES[ext]):
+        raise UploadRejected(400, f"File content does not look like a {ext} file")
+
+
+def _check_docx_package(path: str):
+    # Only the zip central directory is read, so this stays cheap for large files
+    try:
+        with zipfile.ZipFile(path) as zf:
+            if "word/document.xml" not in zf.namelist():
+                raise UploadRejected(400, "File content does not look like a .docx file")
+    except zipfile.BadZipFile:
+        raise UploadRejected(400, "File content does not look like a .docx file")
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int, chunk_size: int = CHUNK_SIZE,
+                      executor=None) -> StoredUpload:
+    """Stream an upload to `dest_path` in fixed-size chunks.
+
+    The extension and magic bytes are checked before the first write, the sha256 is
+    computed as chunks arrive, and the file only appears at `dest_path` (via an atomic
+    rename) once it has been fully written and validated. Memory use is bounded by
+    `chunk_size` regardless of the upload's size. Writes run on `executor` (a
+    BoundedExecutor) when given, else on the loop's default executor.
+    """
+    ext = check_extension(file.filename)
+    if file.size is not None and file.size > max_bytes:
+        raise UploadRejected(413, f"File exceeds the {max_bytes} byte upload limit")
+
+    head = await file.read(chunk_size)
+    if not head:
+        raise UploadRejected(400, "Uploaded file is empty")
+    check_magic(ext, head)
+
+    loop = asyncio.get_running_loop()
+    run = executor.run if executor is not None else functools.partial(loop.run_in_executor, None)
+    dest_dir = os.path.dirname(dest_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(413, f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                await run(out.write, chunk)
+                chunk = await file.read(chunk_size)
+        if ext == ".docx":
+            await run(_check_docx_package, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    return StoredUpload(path=dest_path, size=size, sha256=digest.hexdigest())
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware capping request bodies per path with 413.
+
+    Starlette spools multipart forms to memory and temp disk before an endpoint runs, so
+    `save_upload`'s limit alone cannot bound either. A Content-Length over the limit is
+    refused before the body is read; a body without one is cut off once it passes the limit.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        detail = f"Request body exceeds the {limit} byte limit"
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,252 @@
+"""
+Version history of documents: a snapshot before every modification, stored as content-addressed zip members
+"""
+
+import difflib
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from typing import List, Optional
+
+from extraction import iter_docx_lines
+
+
+class VersionNotFound(Exception):
+    """Raised when a document has no version with the requested number"""
+
+
+class VersionStore:
+    """Snapshots of DOCX files, deduplicated member by member.
+
+    A DOCX is a zip of XML parts and media; an edit usually changes word/document.xml
+    and nothing else. Each member is stored once as `<folder>/blobs/<sha256>`
+    (zlib-compressed) and a version is just the ordered list of (name, blob) pairs,
+    so a snapshot costs about the size of the parts that changed. When the blobs
+    exceed `max_bytes`, the least recently used versions are dropped (the newest
+    version of each document is kept) and unreferenced blobs are deleted.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 256 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(folder, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db_path = os.path.join(folder, "versions.sqlite3")
+        # Snapshots and garbage collection both check for blobs and then write or delete them;
+        # the lock (within this process) and BEGIN IMMEDIATE (across processes) keep them apart
+        self._write_lock = threading.Lock()
+        self.evicted_versions = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    reason TEXT,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    UNIQUE (document, number)
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS members (
+                    version_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    blob TEXT NOT NULL,
+                    PRIMARY KEY (version_id, position)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS members_blob ON members (blob)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL
+                )"""
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256)
+
+    def _put_blob(self, conn, data: bytes) -> str:
+        sha256 = hashlib.sha256(data).hexdigest()
+        if conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone():
+            return sha256
+        stored = zlib.compress(data, 6)
+        path = self._blob_path(sha256)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp, "wb") as f:
+            f.write(stored)
+        os.replace(tmp, path)
+        conn.execute("INSERT OR IGNORE INTO blobs (sha256, size, stored_size) VALUES (?, ?, ?)",
+                     (sha256, len(data), len(stored)))
+        return sha256
+
+    def _read_blob(self, sha256: str) -> bytes:
+        with open(self._blob_path(sha256), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def snapshot(self, document: str, path: str, reason: Optional[str] = None) -> int:
+        """Record the file's current content as the document's next version and return its number.
+
+        Nothing new is stored when the content equals the latest version.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            latest = conn.execute(
+                "SELECT number, sha256 FROM versions WHERE document = ? ORDER BY number DESC LIMIT 1", (document,)
+            ).fetchone()
+            if latest and latest[1] == sha256:
+                return latest[0]
+            number = latest[0] + 1 if latest else 1
+            now = time.time()
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                members = [(info.filename, self._put_blob(conn, zf.read(info))) for info in zf.infolist()]
+            version_id = conn.execute(
+                """INSERT INTO versions (document, number, sha256, size, reason, created_at, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (document, number, sha256, len(data), reason, now, now),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO members (version_id, position, name, blob) VALUES (?, ?, ?, ?)",
+                [(version_id, position, name, blob) for position, (name, blob) in enumerate(members)],
+            )
+        self.collect_garbage()
+        return number
+
+    def _version(self, conn, document: str, number: int):
+        row = conn.execute(
+            "SELECT id FROM versions WHERE document = ? AND number = ?", (document, number)
+        ).fetchone()
+        if row is None:
+            raise VersionNotFound(f"Version {number} of '{document}' not found")
+        conn.execute("UPDATE versions SET last_access = ? WHERE id = ?", (time.time(), row[0]))
+        return row[0]
+
+    def _members(self, conn, version_id: int):
+        return conn.execute(
+            "SELECT name, blob FROM members WHERE version_id = ? ORDER BY position", (version_id,)
+        ).fetchall()
+
+    def list(self, document: str) -> List[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT number, sha256, size, reason, created_at FROM versions
+                   WHERE document = ? ORDER BY number DESC""",
+                (document,),
+            ).fetchall()
+        return [
+            {"version": number, "sha256": sha256, "size": size, "reason": reason, "created_at": created_at}
+            for number, sha256, size, reason, created_at in rows
+        ]
+
+    def restore(self, document: str, number: int, dest_path: str):
+        """Write version `number` of the document to `dest_path` (atomically)"""
+        with self._connect() as conn:
+            members = self._members(conn, self._version(conn, document, number))
+        tmp = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.part"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, blob in members:
+                zf.writestr(name, self._read_blob(blob))
+        os.replace(tmp, dest_path)
+
+    def rollback(self, document: str, number: int, path: str) -> int:
+        """Snapshot the file, then replace it with version `number`; returns the snapshot's number"""
+        with self._connect() as conn:
+            self._version(conn, document, number)
+        saved = self.snapshot(document, path, "rollback")
+        self.restore(document, number, path)
+        return saved
+
+    def _lines(self, members) -> List[str]:
+        blob = dict(members).get("word/document.xml")
+        if blob is None:
+            return []
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            zf.writestr("word/document.xml", self._read_blob(blob))
+        return [line for line in iter_docx_lines(buffer) if line.strip()]
+
+    def diff(self, document: str, number: int, current_path: Optional[str] = None,
+             against: Optional[int] = None) -> dict:
+        """Text diff and changed zip members from version `number` to version `against` (or the current file)"""
+        with self._connect() as conn:
+            old = self._members(conn, self._version(conn, document, number))
+            if against is not None:
+                new = self._members(conn, self._version(conn, document, against))
+        if against is None:
+            with zipfile.ZipFile(current_path) as zf:
+                new = [(info.filename, hashlib.sha256(zf.read(info)).hexdigest()) for info in zf.infolist()]
+            new_lines = [line for line in iter_docx_lines(current_path) if line.strip()]
+        else:
+            new_lines = self._lines(new)
+        old_blobs, new_blobs = dict(old), dict(new)
+        changed = sorted(name for name in old_blobs.keys() | new_blobs.keys() if old_blobs.get(name) != new_blobs.get(name))
+        to_label = "current" if against is None else f"v{against}"
+        diff = difflib.unified_diff(self._lines(old), new_lines, f"v{number}", to_label, lineterm="")
+        return {"from": number, "to": against if against is not None else "current",
+                "changed_parts": changed, "diff": "\n".join(diff)}
+
+    def collect_garbage(self):
+        """Drop least recently used versions until the blobs fit in max_bytes, keeping each document's newest"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            candidates = conn.execute(
+                """SELECT id FROM versions v WHERE number < (
+                       SELECT MAX(number) FROM versions WHERE document = v.document
+                   ) ORDER BY last_access"""
+            ).fetchall()
+            for (version_id,) in candidates:
+                if total <= self.max_bytes:
+                    break
+                blobs = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT blob FROM members WHERE version_id = ?", (version_id,))]
+                conn.execute("DELETE FROM members WHERE version_id = ?", (version_id,))
+                conn.execute("DELETE FROM versions WHERE id = ?", (version_id,))
+                self.evicted_versions += 1
+                for blob in blobs:
+                    if conn.execute("SELECT 1 FROM members WHERE blob = ? LIMIT 1", (blob,)).fetchone():
+                        continue
+                    stored = conn.execute("SELECT stored_size FROM blobs WHERE sha256 = ?", (blob,)).fetchone()
+                    conn.execute("DELETE FROM blobs WHERE sha256 = ?", (blob,))
+                    total -= stored[0] if stored else 0
+                    try:
+                        os.remove(self._blob_path(blob))
+                    except OSError:
+                        pass
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            versions, documents = conn.execute("SELECT COUNT(*), COUNT(DISTINCT document) FROM versions").fetchone()
+            blobs, stored, logical = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stored_size), 0), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+            snapshot_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM versions").fetchone()[0]
+        return {
+            "documents": documents,
+            "versions": versions,
+            "blobs": blobs,
+            "bytes_stored": stored,
+            "bytes_uncompressed": logical,
+            "snapshot_bytes": snapshot_bytes,
+            "max_bytes": self.max_bytes,
+            "evicted_versions": self.evicted_versions,
+        }
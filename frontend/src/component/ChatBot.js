@@ -16,7 +16,7 @@ function ChatBot() {
     try {
       const res = await axios.post("http://localhost:8000/chat", {
         message: currentInput,
-      });
+      }, { withCredentials: true });
 
       const botMsg = { sender: "bot", text: res.data.response };
       setChat((prev) => [...prev, botMsg]);
@@ -22,7 +22,7 @@ const EditPage = () => {
     try {
       const res = await axios.post("http://localhost:8000/chat", {
         message: input,
-      });
+      }, { withCredentials: true });
 
       const botMsg = { sender: "bot", text: res.data.response };
       setChat((prev) => [...prev, botMsg]);
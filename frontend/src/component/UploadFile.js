@@ -43,6 +43,8 @@ function UploadFile({ onUploaded, onUploadedSuccess }) {
         headers: {
           "Content-Type": "multipart/form-data",
         },
+        // The backend keeps each browser's current document in a session cookie
+        withCredentials: true,
       });
       setMessage(res.data.message);
       if (onUploadedSuccess) onUploadedSuccess();